@@ -0,0 +1,66 @@
+# coding: utf-8
+
+# Tamanho do JSON enviado ao navegador e tempo de montagem do gráfico da série
+# histórica, com e sem a redução de pontos (downsample.py), para períodos de
+# tamanhos diferentes e históricos 1x, 10x e 100x maiores.
+#
+#   python benchmarks/bench_downsample.py [--budget 2000] [--factors 1 10 100]
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+import plotly.express as px
+import plotly.io
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from downsample import downsample  # noqa: E402
+from synthetic import scaled_history  # noqa: E402
+
+PERIODS = {'tudo': None, '5 anos': pd.DateOffset(years=5), '6 meses': pd.DateOffset(months=6)}
+
+
+def render(df):
+    # o mesmo caminho do app: px.line + serialização feita pelo st.plotly_chart
+    fig = px.line(df, x='Data', y='Preço', title='Série Histórica Preço Petróleo bruto')
+
+    return plotly.io.to_json(fig, validate=False)
+
+
+def measure(df, budget, method):
+    inicio = time.perf_counter()
+
+    if method != 'sem redução':
+        df = downsample(df, x='Data', y='Preço', n_out=budget, method=method)
+
+    payload = render(df)
+
+    return len(df), len(payload), time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget', type=int, default=2000)
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 10, 100])
+    args = parser.parse_args()
+
+    print(f"{'histórico':>9} {'período':>8} {'método':>11} {'pontos':>8} {'bytes':>10} {'tempo':>8}")
+
+    for factor in args.factors:
+        df = scaled_history(factor).rename(columns={'ds': 'Data', 'y': 'Preço'})[['Data', 'Preço']]
+
+        for nome, janela in PERIODS.items():
+            recorte = df if janela is None else df[df['Data'] >= df['Data'].iloc[-1] - janela]
+
+            for method in ('sem redução', 'minmax', 'lttb'):
+                pontos, tamanho, tempo = measure(recorte, args.budget, method)
+
+                print(f"{factor:>8}x {nome:>8} {method:>11} {pontos:>8} {tamanho:>10} {tempo:>7.3f}s")
+
+
+if __name__ == '__main__':
+    main()
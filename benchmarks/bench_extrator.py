@@ -0,0 +1,99 @@
+# coding: utf-8
+
+# Compara o caminho antigo do extrac() (pd.read_html(...)[2]) com o extrator
+# incremental em pipeline_carga_dados/extrator.py, usando a página salva do IPEA.
+# Cada medição roda num processo novo para que o pico de memória (ru_maxrss) de uma
+# variante não contamine a outra.
+#
+#   python benchmarks/bench_extrator.py [--fixture caminho] [--repeat N]
+
+import argparse
+import gzip
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE = os.path.join(ROOT, 'benchmarks', 'fixtures', 'ipea_brent.html.gz')
+
+sys.path.insert(0, os.path.join(ROOT, 'pipeline_carga_dados'))
+
+
+def read_html_path(fixture):
+    # reprodução do extrac() original
+    import pandas as pd
+
+    with gzip.open(fixture, 'rb') as html:
+        df = pd.read_html(html, decimal=',', thousands='.')[2]
+
+    df.columns = df.iloc[0]
+    df = df[1:]
+    df = df.rename(columns={df.columns[1]: 'preco_petroleo_bruto'})
+    df['preco_petroleo_bruto'] = df['preco_petroleo_bruto'].astype(float)
+
+    return len(df)
+
+
+def extrator_path(fixture, watermark=None):
+    from extrator import extract_prices
+
+    datas, _ = extract_prices(fixture, watermark=watermark)
+
+    return len(datas)
+
+
+VARIANTS = {
+    'read_html': lambda fixture: read_html_path(fixture),
+    'extrator': lambda fixture: extrator_path(fixture),
+    'extrator_incremental': lambda fixture: extrator_path(fixture, watermark='2024-01-08'),
+}
+
+
+def run_variant(variant, fixture):
+    # executado no processo filho: importa as dependências antes de medir
+    import pandas  # noqa: F401
+    import lxml.etree  # noqa: F401
+
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    inicio = time.perf_counter()
+    linhas = VARIANTS[variant](fixture)
+    tempo = time.perf_counter() - inicio
+
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss
+
+    print(json.dumps({'variant': variant, 'rows': linhas,
+                      'seconds': round(tempo, 4), 'peak_rss_kb': pico}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fixture', default=FIXTURE)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--variant', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args.variant, args.fixture)
+        return
+
+    for variant in VARIANTS:
+        resultados = []
+
+        for _ in range(args.repeat):
+            saida = subprocess.run([sys.executable, __file__, '--variant', variant,
+                                    '--fixture', args.fixture],
+                                   check=True, capture_output=True, text=True)
+            resultados.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+        melhor = min(resultados, key=lambda r: r['seconds'])
+        print(f"{variant:<22} linhas={melhor['rows']:>6} "
+              f"tempo={melhor['seconds']:.3f}s "
+              f"pico_rss={max(r['peak_rss_kb'] for r in resultados) / 1024:.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# coding: utf-8
+
+# Latência x precisão dos modos de previsão (pipeline_carga_dados/prediction.py) com o
+# modelo publicado em shared/. Para cada horizonte mede o tempo de cada modo e compara
+# o resultado com uma simulação completa de referência, feita com outra semente:
+# diferença máxima do yhat e erro absoluto médio dos limites do intervalo, também
+# relativo à meia largura média da referência. A linha `full` mostra o próprio ruído
+# de Monte Carlo da simulação, o piso de erro de qualquer modo.
+#
+#   python benchmarks/bench_predict_modes.py [--horizons 1 30 365] [--samples 50 200]
+
+import argparse
+import logging
+import os
+import sys
+import timeit
+import warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'pipeline_carga_dados'))
+
+import prediction  # noqa: E402
+from artifacts import current_path  # noqa: E402
+from pipeline import MODEL, load_model  # noqa: E402
+
+warnings.filterwarnings('ignore')
+logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+
+
+def latency(fn, repeat=3):
+    # menor tempo por chamada, em ms, repetindo cada amostra até ~0,2s como o timeit
+    fn()
+
+    number, _ = timeit.Timer(fn).autorange()
+
+    return min(timeit.Timer(fn).repeat(repeat=repeat, number=number)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--horizons', type=int, nargs='+', default=[1, 30, 365])
+    parser.add_argument('--samples', type=int, nargs='+', default=[50, 200],
+                        help='simulações testadas no modo sampled')
+    args = parser.parse_args()
+
+    model = load_model(os.path.join(current_path(os.path.join(ROOT, 'shared', 'series', 'petro')), MODEL))
+
+    # calibração como a do pipeline: simulação completa de todo o maior horizonte
+    fut = model.make_future_dataframe(periods=max(args.horizons), include_history=False, freq='D')
+
+    np.random.seed(0)
+    calibration = prediction.calibrate(model, prediction.predict(model, fut, mode='full'))
+
+    modos = ([('full', {})] + [(f'sampled({n})', {'mode': 'sampled', 'samples': n}) for n in args.samples]
+             + [('analytic', {'mode': 'analytic', 'calibration': calibration}), ('none', {'mode': 'none'})])
+
+    print(f"{'horizonte':>9} {'modo':<13} {'ms':>9} {'dif. yhat':>10} {'erro limites':>13} {'relativo':>9}")
+
+    for horizon in args.horizons:
+
+        futuro = fut.head(horizon)
+
+        np.random.seed(1)
+        referencia = prediction.predict(model, futuro, mode='full')
+        meia_largura = ((referencia['yhat_upper'] - referencia['yhat_lower']) / 2).mean()
+
+        for nome, opcoes in modos:
+
+            opcoes = {'mode': 'full', **opcoes}
+
+            np.random.seed(2)
+            forecast = prediction.predict(model, futuro, **opcoes)
+
+            ms = latency(lambda: prediction.predict(model, futuro, **opcoes))
+
+            dif_yhat = np.abs(forecast['yhat'] - referencia['yhat']).max()
+
+            if opcoes['mode'] == 'none':
+                erro = relativo = '-'
+            else:
+                erro = np.mean([np.abs(forecast[c] - referencia[c]).mean() for c in ('yhat_lower', 'yhat_upper')])
+                relativo = f'{erro / meia_largura:.1%}'
+                erro = f'{erro:.3f}'
+
+            print(f"{horizon:>9} {nome:<13} {ms:>9.2f} {dif_yhat:>10.2e} {erro:>13} {relativo:>9}")
+
+
+if __name__ == '__main__':
+    main()
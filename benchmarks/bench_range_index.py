@@ -0,0 +1,102 @@
+# coding: utf-8
+
+# KPIs do período (mínimo, média e máximo do preço) pelo caminho do pandas (filtro do
+# DataFrame por data e min/mean/max da cópia filtrada) e pelo índice de range_stats.py,
+# para períodos de tamanhos diferentes, inclusive sem linhas, e históricos 1x, 10x e
+# 100x maiores. Mostra também o tempo de montagem e o tamanho do índice, pagos uma vez
+# por versão dos dados, e termina com erro se os dois caminhos derem KPIs diferentes.
+#
+#   python benchmarks/bench_range_index.py [--factors 1 10 100] [--repeat 20]
+
+import argparse
+import os
+import sys
+import time
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from range_stats import RangeStats  # noqa: E402
+from synthetic import scaled_history  # noqa: E402
+
+
+def periods(df):
+    # (início, fim) de cada período; os dois últimos não têm linhas (largura zero e
+    # depois do último dia, que o slider do app permite)
+    fim = df['Data'].iloc[-1] + pd.Timedelta(days=1)
+
+    return {'tudo': (df['Data'].iloc[0], fim),
+            '5 anos': (df['Data'].iloc[-1] - pd.DateOffset(years=5), fim),
+            '6 meses': (df['Data'].iloc[-1] - pd.DateOffset(months=6), fim),
+            'vazio': (df['Data'].iloc[-1], df['Data'].iloc[-1]),
+            'após fim': (fim, fim + pd.DateOffset(months=6))}
+
+
+def pandas_kpis(df, inicio, fim):
+    # o caminho anterior do app: cópia filtrada do período e três agregações
+    df_filter = df[(df['Data'] >= inicio) & (df['Data'] < fim)]
+
+    return df_filter['Preço'].min(), round(float(df_filter['Preço'].mean()), 2), df_filter['Preço'].max()
+
+
+def index_kpis(index, inicio, fim):
+
+    stats = index.stats(inicio, fim)
+
+    return stats['min'], round(float(stats['mean']), 2), stats['max']
+
+
+def best_us(fn, repeat):
+
+    return min(timeit.Timer(fn).repeat(repeat=repeat, number=1)) * 1e6
+
+
+def index_bytes(index):
+
+    return index.soma.nbytes + index.contagem.nbytes + sum(n.nbytes for n in index.minimo + index.maximo)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    diferentes = []
+
+    print(f"{'histórico':>9} {'linhas':>9} {'período':>8} {'pandas µs':>11} {'índice µs':>10} {'ganho':>8}")
+
+    for factor in args.factors:
+        df = scaled_history(factor).rename(columns={'ds': 'Data', 'y': 'Preço'})[['Data', 'Preço']]
+
+        inicio = time.perf_counter()
+        index = RangeStats(df['Data'].to_numpy(), df['Preço'].to_numpy())
+        montagem = time.perf_counter() - inicio
+
+        for nome, (comeco, fim) in periods(df).items():
+
+            esperado, obtido = pandas_kpis(df, comeco, fim), index_kpis(index, comeco, fim)
+
+            if not np.array_equal(esperado, obtido, equal_nan=True):
+                diferentes.append(f"{factor}x {nome}: pandas {esperado}, índice {obtido}")
+
+            com_pandas = best_us(lambda: pandas_kpis(df, comeco, fim), args.repeat)
+            com_indice = best_us(lambda: index_kpis(index, comeco, fim), args.repeat)
+
+            print(f"{factor:>8}x {len(df):>9} {nome:>8} {com_pandas:>11.1f} {com_indice:>10.1f} "
+                  f"{com_pandas / com_indice:>7.0f}x")
+
+        print(f"{'':>9} índice montado em {montagem * 1000:.1f} ms, "
+              f"{index_bytes(index) / 2 ** 20:.1f} MiB além da série")
+
+    if diferentes:
+        print('\n' + '\n'.join(diferentes))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# coding: utf-8
+
+# Memória residente (RSS) do processo do app com 1, 10 e 100 sessões simultâneas no
+# período padrão do slider, antes e depois da tabela Arrow compartilhada
+# (dashboard.price_dataset), para históricos 1x e 10x maiores.
+#
+# Cada combinação roda num processo novo, que simula as sessões mantendo vivos ao
+# mesmo tempo os objetos de uma execução da página inicial (app.py):
+#
+# - antes: o st.cache_data guarda o valor serializado e devolve uma cópia nova a cada
+#   chamada, então cada sessão tem o seu DataFrame do período (load_period), a cópia
+#   sem unique_id exibida na tabela e os bytes do CSV de exportação;
+# - depois: a tabela e o índice (range_stats.py) existem uma vez por processo; cada
+#   sessão tem só a fatia do período, a seleção de colunas exibida e uma referência
+#   aos mesmos bytes do CSV (st.cache_resource).
+#
+#   python benchmarks/bench_session_memory.py [--factors 1 10] [--sessions 1 10 100]
+
+import argparse
+import gc
+import json
+import os
+import pickle
+import subprocess
+import sys
+
+import pandas as pd
+import pyarrow as pa
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dashboard import column  # noqa: E402
+from range_stats import RangeStats  # noqa: E402
+from synthetic import scaled_history  # noqa: E402
+
+MODES = ('antes', 'depois')
+
+
+def rss_mib():
+    # RSS atual do processo (Linux)
+    with open('/proc/self/statm', 'r') as file:
+        paginas = int(file.read().split()[1])
+
+    return paginas * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def sessions_before(df, inicio, fim, sessions):
+    # valores em cache como o st.cache_data os guarda: serializados, uma vez por processo
+    periodo = df[(df['ds'] >= inicio) & (df['ds'] < fim)].rename(columns={'ds': 'Data', 'y': 'Preço'})
+    periodo = pickle.dumps(periodo)
+    csv = pickle.dumps(pickle.loads(periodo).drop('unique_id', axis=1).to_csv(index=False).encode('latin1'))
+
+    vivas = []
+
+    for _ in range(sessions):
+        df_filter = pickle.loads(periodo)
+        df_filter = df_filter.drop('unique_id', axis=1)
+
+        vivas.append((df_filter, pickle.loads(csv)))
+
+    return vivas
+
+
+def sessions_after(df, inicio, fim, sessions):
+    # o mesmo que dashboard.price_dataset, price_index, period_slice e converte_csv
+    tabela = pa.Table.from_pandas(df.rename(columns={'ds': 'Data', 'y': 'Preço'}),
+                                  preserve_index=False).replace_schema_metadata().combine_chunks()
+    index = RangeStats(column(tabela, 'Data'), column(tabela, 'Preço'))
+
+    i, j = index.bounds(inicio, fim)
+    csv = tabela.slice(i, j - i).select(['Data', 'Preço']).to_pandas().to_csv(index=False).encode('latin1')
+
+    vivas = []
+
+    for _ in range(sessions):
+        i, j = index.bounds(inicio, fim)
+        periodo = tabela.slice(i, j - i)
+
+        vivas.append((periodo.select(['Data', 'Preço']), index.stats(inicio, fim), csv))
+
+    return vivas
+
+
+def child(mode, factor, sessions):
+    df = scaled_history(factor)
+    inicio, fim = df['ds'].iloc[0], df['ds'].iloc[-1] + pd.Timedelta(days=1)
+
+    gc.collect()
+    antes = rss_mib()
+
+    vivas = (sessions_before if mode == 'antes' else sessions_after)(df, inicio, fim, sessions)
+    del df
+
+    gc.collect()
+    depois = rss_mib()
+
+    print(json.dumps({'rss': depois, 'delta': depois - antes, 'alive': len(vivas)}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--child', nargs=3, metavar=('MODO', 'FATOR', 'SESSOES'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], int(args.child[1]), int(args.child[2]))
+        return
+
+    print(f"{'histórico':>9} {'sessões':>8} {'modo':>7} {'RSS MiB':>9} {'dados MiB':>10} {'por sessão':>11}")
+
+    for factor in args.factors:
+        for sessions in args.sessions:
+            for mode in MODES:
+                saida = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode,
+                                        str(factor), str(sessions)], capture_output=True, text=True, check=True)
+                medida = json.loads(saida.stdout.strip().splitlines()[-1])
+
+                print(f"{factor:>8}x {sessions:>8} {mode:>7} {medida['rss']:>9.1f} {medida['delta']:>10.1f} "
+                      f"{medida['delta'] / sessions:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
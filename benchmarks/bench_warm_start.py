@@ -0,0 +1,94 @@
+# coding: utf-8
+
+# Tempo e iterações do ajuste do Prophet com e sem warm start, nos dados publicados.
+# Refaz execuções noturnas em várias datas ("hoje") do fim do histórico: o modelo
+# anterior é treinado sem os últimos N dias e o de hoje é ajustado com o histórico até
+# a data, do zero e partindo do anterior. N = 1 é o retreino de um dia para o outro; no
+# pipeline o modelo só é retreinado por drift ou idade (drift.py), então o anterior
+# costuma ter de DRIFT_MIN_DAYS a MAX_MODEL_AGE dias (30).
+#
+# Para cada N mostra o tempo somado (mediana de --repeat ajustes por data), as
+# iterações somadas, quantas datas o warm start foi mais lento e a maior diferença
+# entre as previsões dos dois ajustes para os 365 dias seguintes.
+#
+#   python benchmarks/bench_warm_start.py [--days 1 7 30] [--origins 5] [--repeat 3]
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'pipeline_carga_dados'))
+
+from artifacts import current_path  # noqa: E402
+from storage import read_refined  # noqa: E402
+from pipeline import DEFAULT_PARAMS, fit_model, train_split_data  # noqa: E402
+
+warnings.filterwarnings('ignore')
+logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+
+
+def timed_fit(df_train, previous, repeat):
+    # o ajuste é determinístico (mesmas iterações); só o tempo varia entre repetições
+    tempos = []
+
+    for _ in range(repeat):
+        model, report = fit_model(df_train, previous=previous)
+        tempos.append(report['seconds'])
+
+    return model, report, statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, nargs='+', default=[1, 7, 30])
+    parser.add_argument('--origins', type=int, default=5,
+                        help='datas refeitas, uma a cada 30 dias a partir do fim do histórico')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--start-train', default=DEFAULT_PARAMS['start_train'])
+    args = parser.parse_args()
+
+    refined_dir = os.path.join(current_path(os.path.join(ROOT, 'shared', 'series', 'petro')), 'refined_data')
+
+    df = read_refined(refined_dir)
+    df_train, _ = train_split_data(dff=df, start_train=args.start_train)
+
+    print(f"{'dias novos':>10} {'cold s':>8} {'warm s':>8} {'ganho':>6} {'iter. cold':>11} {'iter. warm':>11} "
+          f"{'warm mais lento':>16} {'dif. máx. yhat':>15}")
+
+    for dias in args.days:
+
+        total = {'cold': 0.0, 'warm': 0.0}
+        iteracoes = {'cold': 0, 'warm': 0}
+        mais_lento = 0
+        diferenca = 0.0
+
+        for origem in range(args.origins):
+
+            hoje = df_train.iloc[:len(df_train) - 30 * origem]
+            previous, _ = fit_model(hoje.iloc[:-dias])
+
+            cold, report_cold, tempo_cold = timed_fit(hoje, None, args.repeat)
+            warm, report_warm, tempo_warm = timed_fit(hoje, previous, args.repeat)
+
+            total['cold'] += tempo_cold
+            total['warm'] += tempo_warm
+            iteracoes['cold'] += report_cold['iterations'] or 0
+            iteracoes['warm'] += report_warm['iterations'] or 0
+            mais_lento += tempo_warm > tempo_cold
+
+            futuro = cold.make_future_dataframe(periods=365, include_history=False)
+            diferenca = max(diferenca, np.abs(cold.predict(futuro)['yhat'] - warm.predict(futuro)['yhat']).max())
+
+        print(f"{dias:>10} {total['cold']:>8.2f} {total['warm']:>8.2f} {total['cold'] / total['warm']:>5.2f}x "
+              f"{iteracoes['cold']:>11} {iteracoes['warm']:>11} {mais_lento:>10} de {args.origins:<3} "
+              f"{diferenca:>15.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+# coding: utf-8
+
+# Orçamento de tempo de importação das páginas do app (app.py e pages/*.py).
+#
+# Para cada página executa só os imports do topo do arquivo num processo novo com
+# `python -X importtime` e soma o tempo acumulado dos módulos importados diretamente
+# (menor valor de `--repeat` execuções). Termina com erro se alguma página:
+#
+# - importar um módulo proibido na interface (Prophet, cmdstanpy, clientes do Google
+#   Cloud, joblib): essas dependências devem ser importadas só quando usadas;
+# - ficar mais lenta que o baseline (benchmarks/import_baseline.json) além do limite
+#   relativo `--threshold` e de `--min-delta` ms;
+# - passar de `--budget-ms`, se informado.
+#
+#   python benchmarks/check_import_time.py [--repeat 5] [--threshold 0.25] [--budget-ms 2500]
+#                                          [--save-baseline] [paginas ...]
+
+import argparse
+import ast
+import glob
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, 'benchmarks', 'import_baseline.json')
+
+FORBIDDEN = ('prophet', 'cmdstanpy', 'google.cloud', 'google.oauth2', 'joblib')
+
+
+def pages():
+
+    return ['app.py'] + sorted(os.path.relpath(p, ROOT) for p in glob.glob(os.path.join(ROOT, 'pages', '*.py')))
+
+
+def top_imports(filepath):
+    # Código com os imports do nível de topo do arquivo, na ordem original
+    with open(filepath, 'r') as file:
+        arvore = ast.parse(file.read())
+
+    return '\n'.join(ast.unparse(no) for no in arvore.body if isinstance(no, (ast.Import, ast.ImportFrom)))
+
+
+def importtime(codigo):
+    # {módulo: tempo acumulado em µs} e os módulos importados diretamente pelo código
+    saida = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo], cwd=ROOT,
+                           env={**os.environ, 'PYTHONPATH': ROOT}, capture_output=True, text=True)
+
+    if saida.returncode != 0:
+        raise RuntimeError(saida.stderr.strip().splitlines()[-1])
+
+    modulos, diretos = {}, []
+
+    for linha in saida.stderr.splitlines():
+
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+
+        _, acumulado, nome = linha[len('import time:'):].split('|')
+
+        modulos[nome.strip()] = int(acumulado)
+
+        # sem recuo: importado pelo próprio código e não por outro módulo
+        if not nome[1:].startswith(' '):
+            diretos.append(nome.strip())
+
+    return modulos, diretos
+
+
+def measure(filepath, repeat):
+    codigo = top_imports(os.path.join(ROOT, filepath))
+
+    # módulos da inicialização do interpretador (site, encodings...) não contam
+    inicializacao = set(importtime('pass')[0])
+
+    melhor = None
+
+    for _ in range(repeat):
+
+        modulos, diretos = importtime(codigo)
+        diretos = [nome for nome in diretos if nome not in inicializacao]
+        total = sum(modulos[nome] for nome in diretos) / 1000
+
+        if melhor is None or total < melhor['ms']:
+            melhor = {'ms': round(total, 1),
+                      'top': sorted(((nome, round(modulos[nome] / 1000, 1)) for nome in diretos),
+                                    key=lambda item: -item[1])[:5],
+                      'forbidden': sorted(nome for nome in modulos
+                                          if any(nome == f or nome.startswith(f + '.') for f in FORBIDDEN))}
+
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('pages', nargs='*', help='páginas a medir (padrão: app.py e pages/*.py)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='aumento relativo aceito em relação ao baseline')
+    parser.add_argument('--min-delta', type=float, default=50,
+                        help='diferença mínima em ms para contar como regressão')
+    parser.add_argument('--budget-ms', type=float, help='tempo máximo absoluto por página')
+    args = parser.parse_args()
+
+    baseline = {}
+
+    if os.path.exists(args.baseline) and not args.save_baseline:
+
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+
+    results, falhas = {}, []
+
+    for pagina in args.pages or pages():
+
+        results[pagina] = atual = measure(pagina, args.repeat)
+
+        referencia = baseline.get(pagina, {}).get('ms')
+
+        print(f"{pagina:<36} {atual['ms']:>8.1f} ms"
+              + (f"  (baseline {referencia:.1f} ms, {atual['ms'] / referencia:.2f}x)" if referencia else ''))
+        print('    ' + ', '.join(f'{nome} {ms:.0f}' for nome, ms in atual['top']))
+
+        if atual['forbidden']:
+            falhas.append(f"{pagina}: importa {', '.join(atual['forbidden'][:5])}")
+
+        if referencia and atual['ms'] > referencia * (1 + args.threshold) and atual['ms'] - referencia > args.min_delta:
+            falhas.append(f"{pagina}: {atual['ms']:.0f} ms, acima do baseline de {referencia:.0f} ms")
+
+        if args.budget_ms and atual['ms'] > args.budget_ms:
+            falhas.append(f"{pagina}: {atual['ms']:.0f} ms, acima do orçamento de {args.budget_ms:.0f} ms")
+
+    if args.save_baseline:
+
+        with open(args.baseline, 'w') as file:
+            json.dump({pagina: {'ms': r['ms']} for pagina, r in results.items()}, file, indent=2, ensure_ascii=False)
+
+        print(f"Baseline gravado em {args.baseline}")
+
+    if falhas:
+        print('\n' + '\n'.join(falhas))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
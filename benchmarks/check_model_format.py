@@ -0,0 +1,152 @@
+# coding: utf-8
+
+# Equivalência e custo do formato binário do modelo (pipeline_carga_dados/model_format.py)
+# em relação ao model_to_json/model_from_json do Prophet.
+#
+# O modelo publicado em shared/ (ou --model) é gravado nos dois formatos e lido de
+# volta. Termina com erro se algum atributo do modelo lido do binário for diferente do
+# lido do JSON ou se as previsões (histórico e `--horizon` dias futuros, com as
+# simulações do intervalo na mesma semente) não forem idênticas. Depois mostra o
+# tamanho de cada arquivo e o tempo de gravação e de leitura (menor de `--repeat`).
+#
+#   python benchmarks/check_model_format.py [--model caminho] [--horizon 365] [--repeat 5]
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import timeit
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'pipeline_carga_dados'))
+
+import model_format  # noqa: E402
+from artifacts import current_path  # noqa: E402
+
+warnings.filterwarnings('ignore')
+logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+
+
+def write_json(model, path):
+    from prophet.serialize import model_to_json
+
+    with open(path, 'w') as file:
+        file.write(model_to_json(model))
+
+
+def differences(esperado, lido):
+    # Atributos serializados que diferem entre os dois modelos
+    diferentes = []
+
+    for nome in model_format.SIMPLE_ATTRIBUTES + model_format.ORDEREDDICT + ['start', 't_scale', 'fit_kwargs']:
+        if getattr(esperado, nome) != getattr(lido, nome):
+            diferentes.append(nome)
+
+    for nome in model_format.PD_SERIES + model_format.PD_DATAFRAME:
+
+        a, b = getattr(esperado, nome), getattr(lido, nome)
+
+        if a is None or b is None:
+            if a is not b:
+                diferentes.append(nome)
+            continue
+
+        try:
+            (pd.testing.assert_series_equal if nome in model_format.PD_SERIES else pd.testing.assert_frame_equal)(
+                a, b, check_exact=True)
+        except AssertionError:
+            diferentes.append(nome)
+
+    if not np.array_equal(esperado.changepoints_t, lido.changepoints_t):
+        diferentes.append('changepoints_t')
+
+    for nome, valor in esperado.params.items():
+        if nome not in lido.params or valor.shape != lido.params[nome].shape \
+                or not np.array_equal(valor, lido.params[nome]):
+            diferentes.append(f'params/{nome}')
+
+    return diferentes
+
+
+def same_forecast(esperado, lido, horizon):
+
+    futuro = esperado.make_future_dataframe(periods=horizon, include_history=True, freq='D')
+
+    np.random.seed(0)
+    a = esperado.predict(futuro)
+
+    np.random.seed(0)
+    b = lido.predict(futuro)
+
+    try:
+        pd.testing.assert_frame_equal(a, b, check_exact=True)
+    except AssertionError as err:
+        print(f"Previsões diferentes: {err}")
+        return False
+
+    return True
+
+
+def best_ms(fn, repeat):
+
+    fn()
+
+    return min(timeit.Timer(fn).repeat(repeat=repeat, number=1)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', help='modelo (.bin ou .json); padrão: o publicado em shared/')
+    parser.add_argument('--horizon', type=int, default=365)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    path = args.model
+
+    if path is None:
+        pasta = current_path(os.path.join(ROOT, 'shared', 'series', 'petro'))
+        path = os.path.join(pasta, model_format.model_relpath(os.listdir(pasta)))
+
+    model = model_format.load(path)
+
+    pasta = tempfile.mkdtemp(prefix='model_format_')
+    json_path = os.path.join(pasta, model_format.JSON_MODEL_FILE)
+    bin_path = os.path.join(pasta, model_format.MODEL_FILE)
+
+    write_json(model, json_path)
+    model_format.write_model(model, bin_path)
+
+    do_json = model_format.load(json_path)
+    do_bin = model_format.load(bin_path)
+
+    diferentes = differences(do_json, do_bin)
+
+    if diferentes:
+        print(f"Atributos diferentes do model_from_json: {', '.join(diferentes)}")
+
+    iguais = same_forecast(do_json, do_bin, args.horizon) and not diferentes
+
+    print(f"Modelo: {path}")
+    print(f"{'formato':<8} {'bytes':>10} {'gravação ms':>12} {'leitura ms':>11}")
+
+    for nome, arquivo, grava in (('json', json_path, lambda: write_json(model, json_path)),
+                                 ('binário', bin_path, lambda: model_format.write_model(model, bin_path))):
+
+        gravacao = best_ms(grava, args.repeat)
+        leitura = best_ms(lambda: model_format.load(arquivo), args.repeat)
+
+        print(f"{nome:<8} {os.path.getsize(arquivo):>10} {gravacao:>12.2f} {leitura:>11.2f}")
+
+    if not iguais:
+        sys.exit(1)
+
+    print(f"Modelo e previsões de {args.horizon} dias idênticos nos dois formatos")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# coding: utf-8
+
+# Servidor local que imita a página de séries do IPEA, para rodar o pipeline sem
+# acesso ao ipeadata. Responde /ExibeSerie.aspx?serid=<serid> com
+# fixtures/ipea_<serid>.html.gz, se existir, ou com a página do Brent
+# (fixtures/ipea_brent.html.gz). --delay simula a latência do servidor.
+#
+# Cada resposta leva ETag (hash da página) e Last-Modified (data do arquivo) e os GETs
+# condicionais recebem 304 se a página não mudou; --no-validators imita um servidor que
+# não envia esses cabeçalhos.
+#
+#   python benchmarks/ipea_standin.py [--port 8765] [--delay 0.5] [--no-validators]
+#   IPEA_URL='http://localhost:8765/ExibeSerie.aspx?serid={serid}' python pipeline_carga_dados/pipeline.py
+
+import argparse
+import gzip
+import hashlib
+import os
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+DEFAULT_FIXTURE = os.path.join(FIXTURES, 'ipea_brent.html.gz')
+
+
+def page(serid):
+    # (conteúdo, data de modificação) da página da série
+    caminho = os.path.join(FIXTURES, f'ipea_{serid}.html.gz')
+
+    if not os.path.exists(caminho):
+        caminho = DEFAULT_FIXTURE
+
+    with gzip.open(caminho, 'rb') as file:
+        return file.read(), os.path.getmtime(caminho)
+
+
+def make_handler(delay, validators=True):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            serid = parse_qs(urlparse(self.path).query).get('serid', [''])[0]
+
+            time.sleep(delay)
+            corpo, modificado = page(serid)
+
+            etag = f'"{hashlib.sha1(corpo).hexdigest()}"'
+            last_modified = formatdate(modificado, usegmt=True)
+
+            if validators and (self.headers.get('If-None-Match') == etag
+                               or self.headers.get('If-Modified-Since') == last_modified):
+                self.send_response(304)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+
+            if validators:
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', last_modified)
+
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, format, *args):
+            # uma linha por requisição, com o status (para conferir os 304)
+            print(f"{self.command} {self.path} {args[1] if len(args) > 1 else ''}")
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.0)
+    parser.add_argument('--no-validators', action='store_true',
+                        help='não envia ETag/Last-Modified nem responde 304')
+    args = parser.parse_args()
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(args.delay, not args.no_validators))
+
+    print(f"Servindo as páginas de fixtures/ em http://127.0.0.1:{args.port}/ExibeSerie.aspx?serid=...")
+
+    servidor.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
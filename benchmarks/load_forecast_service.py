@@ -0,0 +1,117 @@
+# coding: utf-8
+
+# Teste de carga do forecast_service.py: `--clients` threads fazem `--requests`
+# consultas cada uma (um dia ou um intervalo de `--range-days` dias) sorteando as datas
+# entre `--distinct` dias do horizonte, o que controla a taxa de acerto do cache.
+# Sem --url o serviço é iniciado neste processo, com a versão publicada em shared/.
+#
+#   python benchmarks/load_forecast_service.py [--clients 16] [--requests 50]
+#                                              [--distinct 365] [--range-share 0.1]
+#                                              [--window-ms 5] [--url http://host:8502]
+
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+warnings.filterwarnings('ignore')
+logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+
+
+def get(url):
+
+    with urllib.request.urlopen(url, timeout=60) as resposta:
+        return json.load(resposta)
+
+
+def client(base, n, datas, range_share, range_days, seed):
+    # Latência (s) de cada uma das n consultas
+    aleatorio = random.Random(seed)
+    latencias = []
+
+    for _ in range(n):
+
+        inicio = aleatorio.choice(datas)
+
+        if aleatorio.random() < range_share:
+            fim = inicio + pd.Timedelta(days=range_days - 1)
+            url = f'{base}/forecast?start={inicio:%Y-%m-%d}&end={fim:%Y-%m-%d}'
+        else:
+            url = f'{base}/forecast?date={inicio:%Y-%m-%d}'
+
+        t = time.perf_counter()
+        get(url)
+        latencias.append(time.perf_counter() - t)
+
+    return latencias
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', help='serviço já em execução (padrão: inicia um local)')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=50, help='consultas por cliente')
+    parser.add_argument('--distinct', type=int, default=365, help='dias distintos sorteados')
+    parser.add_argument('--range-share', type=float, default=0.1,
+                        help='fração das consultas que pedem um intervalo')
+    parser.add_argument('--range-days', type=int, default=30)
+    parser.add_argument('--window-ms', type=float, help='BATCH_WINDOW_MS do serviço local')
+    args = parser.parse_args()
+
+    base = args.url
+
+    if base is None:
+
+        # o serviço lê shared/ com caminhos relativos à raiz do repositório
+        os.chdir(ROOT)
+
+        if args.window_ms is not None:
+            os.environ['BATCH_WINDOW_MS'] = str(args.window_ms)
+
+        import forecast_service
+
+        service = forecast_service.ForecastService()
+        service.models.get()
+
+        server = forecast_service.make_server('127.0.0.1', 0, service)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        base = f'http://127.0.0.1:{server.server_address[1]}'
+
+    datas = list(pd.date_range(pd.Timestamp.today().normalize(), periods=args.distinct, freq='D'))
+
+    inicio = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+
+        resultados = list(pool.map(lambda i: client(base, args.requests, datas, args.range_share,
+                                                    args.range_days, seed=i),
+                                   range(args.clients)))
+
+    duracao = time.perf_counter() - inicio
+
+    latencias = np.array([lat for lista in resultados for lat in lista]) * 1000
+
+    print(f"{len(latencias)} consultas de {args.clients} clientes em {duracao:.2f}s: "
+          f"{len(latencias) / duracao:.1f} req/s")
+    print(f"latência p50 {np.percentile(latencias, 50):.1f} ms, p99 {np.percentile(latencias, 99):.1f} ms, "
+          f"média {statistics.mean(latencias):.1f} ms, máx. {latencias.max():.1f} ms")
+    print(json.dumps(get(f'{base}/health'), indent=2))
+
+
+if __name__ == '__main__':
+    main()
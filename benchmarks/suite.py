@@ -0,0 +1,357 @@
+# coding: utf-8
+
+# Suíte de benchmarks do ETL, do treino, da previsão e da renderização do app,
+# executada sem rede: a página do IPEA vem de fixtures/, os dados e o modelo da
+# versão publicada em shared/ e as séries 10x e 100x de synthetic.py.
+#
+# Cada benchmark é medido `--repeat` vezes (a preparação fica fora da medição) e o
+# resultado, com as versões das bibliotecas, é gravado em JSON. Com um baseline
+# (por padrão benchmarks/baseline.json) cada medição é comparada com a de referência
+# e a execução termina com erro se alguma ficar mais lenta que o limite.
+#
+#   python benchmarks/suite.py [--factors 1 10 100] [--only fit predict] [--repeat 3]
+#                              [--threshold 0.25] [--thresholds fit=0.5 render_app=0.5]
+#                              [--min-delta 0.001]
+#                              [--output resultados.json] [--save-baseline]
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'pipeline_carga_dados'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import model_format  # noqa: E402
+import pipeline  # noqa: E402
+import storage  # noqa: E402
+from artifacts import current_path  # noqa: E402
+from synthetic import scaled_history  # noqa: E402
+
+warnings.filterwarnings('ignore')
+logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+
+FIXTURE = os.path.join(ROOT, 'benchmarks', 'fixtures', 'ipea_brent.html.gz')
+SERIES_DIR = os.path.join(ROOT, 'shared', 'series', 'petro')
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+# linhas de treino do modelo publicado (2018-01-01 até o fim do histórico)
+TRAIN_ROWS = 2213
+
+# nome -> (fatores de escala aceitos, função de preparação)
+BENCHMARKS = {}
+
+
+def benchmark(nome, factors=(1,)):
+    # A preparação recebe o fator de escala e devolve a função medida
+    def registra(setup):
+        BENCHMARKS[nome] = (factors, setup)
+        return setup
+
+    return registra
+
+
+def raw_history(factor):
+    # Histórico no formato devolvido pelo extrac() (Data, preco_petroleo_bruto), na
+    # ordem da página: do mais recente para o mais antigo
+    df = scaled_history(factor)
+
+    return pd.DataFrame({'Data': df['ds'].to_numpy()[::-1],
+                         'preco_petroleo_bruto': df['y'].to_numpy()[::-1]})
+
+
+def published_model():
+    # binário ou, numa versão anterior ao model_format.py, o JSON
+    pasta = current_path(SERIES_DIR)
+
+    return os.path.join(pasta, model_format.model_relpath(os.listdir(pasta)))
+
+
+def model_copy(filename):
+    # o modelo publicado regravado num arquivo temporário, no formato do nome do arquivo
+    from prophet.serialize import model_to_json
+
+    model = pipeline.load_model(published_model())
+    path = os.path.join(tempfile.mkdtemp(prefix='model_'), filename)
+
+    if filename.endswith('.json'):
+
+        with open(path, 'w') as file:
+            file.write(model_to_json(model))
+
+    else:
+        model_format.write_model(model, path)
+
+    return path
+
+
+@benchmark('extrac')
+def bench_extrac(factor):
+
+    return lambda: pipeline.extrac(FIXTURE)
+
+
+@benchmark('transform', factors=(1, 10, 100))
+def bench_transform(factor):
+    # a partir de 10x a série sintética é horária e o asfreq('d') do transform a
+    # reduz para diária; o tempo continua proporcional às linhas de entrada
+    raw = raw_history(factor)
+
+    return lambda: pipeline.transform(raw.copy())
+
+
+@benchmark('train_split_data', factors=(1, 10, 100))
+def bench_train_split(factor):
+    df = scaled_history(factor)
+    inicio = df['ds'].iloc[-TRAIN_ROWS * factor]
+
+    return lambda: pipeline.train_split_data(df, start_train=inicio)[0]
+
+
+def refined_dataset(factor):
+    # histórico escalado gravado no layout do refined (partições por ano, storage.py)
+    pasta = os.path.join(tempfile.mkdtemp(prefix='refined_'), 'refined_data')
+    df = scaled_history(factor)
+
+    for ano, parte in df.groupby(df['ds'].dt.year.values):
+        os.makedirs(os.path.join(pasta, f'ano={ano}'))
+        storage.write_refined(parte, os.path.join(pasta, f'ano={ano}', 'part-0.parquet'))
+
+    return pasta, df['ds'].iloc[-1]
+
+
+@benchmark('read_refined_full', factors=(1, 10, 100))
+def bench_read_full(factor):
+    pasta, _ = refined_dataset(factor)
+
+    return lambda: storage.read_refined(pasta)
+
+
+@benchmark('read_refined_6m', factors=(1, 10, 100))
+def bench_read_period(factor):
+    # período curto do slider: os filtros em ds descartam partições e grupos de linhas
+    pasta, fim = refined_dataset(factor)
+
+    return lambda: storage.read_refined(pasta, start=fim - pd.DateOffset(months=6), end=fim)
+
+
+@benchmark('fit', factors=(1, 10))
+def bench_fit(factor):
+    # ajuste do zero com a janela de treino do modelo publicado, escalada
+    df_train = scaled_history(factor).tail(TRAIN_ROWS * factor)
+
+    return lambda: pipeline.fit_model(df_train)[0].history
+
+
+@benchmark('model_from_json')
+def bench_model_from_json(factor):
+    path = model_copy(model_format.JSON_MODEL_FILE)
+
+    return lambda: pipeline.load_model(path)
+
+
+@benchmark('model_read_bin')
+def bench_model_read_bin(factor):
+    path = model_copy(model_format.MODEL_FILE)
+
+    return lambda: pipeline.load_model(path)
+
+
+def bench_predict(horizon):
+
+    def setup(factor):
+        model = pipeline.load_model(published_model())
+        futuro = model.make_future_dataframe(periods=horizon, include_history=False, freq='D')
+
+        return lambda: model.predict(futuro)
+
+    return setup
+
+
+benchmark('predict_30d')(bench_predict(30))
+benchmark('predict_365d')(bench_predict(365))
+
+
+def bench_render(limpa_cache):
+
+    def setup(factor):
+        import streamlit as st
+        from streamlit.testing.v1 import AppTest
+
+        def render():
+            if limpa_cache:
+                st.cache_data.clear()
+                st.cache_resource.clear()
+
+            graficos = []
+
+            # página inicial e as páginas de pages/ (as antigas abas do app.py)
+            for pagina in ['app.py'] + sorted(os.listdir(os.path.join(ROOT, 'pages'))):
+
+                at = AppTest.from_file(os.path.join(ROOT, 'pages' if pagina != 'app.py' else '', pagina),
+                                       default_timeout=300).run()
+
+                if at.exception:
+                    raise RuntimeError(at.exception[0].message)
+
+                graficos += at.get('plotly_chart')
+
+            return graficos
+
+        return render
+
+    return setup
+
+
+benchmark('render_app_cold')(bench_render(limpa_cache=True))
+benchmark('render_app')(bench_render(limpa_cache=False))
+
+
+def measure(fn, repeat):
+    # primeira chamada fora da medição (aquecimento). Funções rápidas são repetidas
+    # dentro de cada amostra até somar ~0,2s (como o timeit), para reduzir o ruído;
+    # o tempo registrado é por chamada
+    resultado = fn()
+
+    number, _ = timeit.Timer(fn).autorange()
+
+    tempos = [t / number for t in timeit.Timer(fn).repeat(repeat=repeat, number=number)]
+
+    return {'min_s': round(min(tempos), 6), 'median_s': round(statistics.median(tempos), 6),
+            'repeat': repeat, 'number': number,
+            'rows': len(resultado) if hasattr(resultado, '__len__') else None}
+
+
+def environment():
+    import prophet
+    import streamlit
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+
+    return {'date': datetime.now().isoformat(timespec='seconds'), 'commit': commit,
+            'python': platform.python_version(), 'machine': platform.machine(),
+            'cpus': os.cpu_count(), 'pandas': pd.__version__, 'numpy': np.__version__,
+            'prophet': prophet.__version__, 'streamlit': streamlit.__version__}
+
+
+def compare(results, baseline, threshold, thresholds, min_delta):
+    # Razão entre o tempo atual e o do baseline (mínimo das repetições). Limite por
+    # benchmark: o de --thresholds com o nome (sem o fator) ou o --threshold geral.
+    # Diferenças abaixo de min_delta segundos são ruído e não contam como regressão
+    regressoes = []
+
+    print(f"\n{'benchmark':<28} {'baseline':>10} {'atual':>10} {'razão':>7} {'limite':>7}")
+
+    for chave, atual in results.items():
+
+        if chave not in baseline:
+            print(f"{chave:<28} {'-':>10} {atual['min_s']:>9.4f}s {'novo':>7}")
+            continue
+
+        nome = chave.split('[')[0]
+        limite = thresholds.get(nome, threshold)
+        razao = atual['min_s'] / baseline[chave]['min_s']
+
+        marca = ''
+        if razao > 1 + limite and atual['min_s'] - baseline[chave]['min_s'] > min_delta:
+            regressoes.append(chave)
+            marca = '  REGRESSÃO'
+
+        print(f"{chave:<28} {baseline[chave]['min_s']:>9.4f}s {atual['min_s']:>9.4f}s "
+              f"{razao:>6.2f}x {1 + limite:>6.2f}x{marca}")
+
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--only', nargs='+', help='nomes dos benchmarks a executar')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results.json'))
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='grava os resultados como o novo baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='aumento relativo de tempo aceito (0.25 = até 25%% mais lento)')
+    parser.add_argument('--min-delta', type=float, default=0.001,
+                        help='diferença mínima em segundos para contar como regressão')
+    parser.add_argument('--thresholds', nargs='+', default=[],
+                        help='limites por benchmark, ex.: fit=0.5 render_app=0.5')
+    args = parser.parse_args()
+
+    # o app lê shared/ com caminhos relativos à raiz do repositório
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+
+    results = {}
+
+    for nome, (factors, setup) in BENCHMARKS.items():
+
+        if args.only and nome not in args.only:
+            continue
+
+        for factor in [f for f in args.factors if f in factors]:
+
+            chave = f'{nome}[{factor}x]'
+            results[chave] = measure(setup(factor), args.repeat)
+
+            print(f"{chave:<28} {results[chave]['min_s']:>9.4f}s (mediana {results[chave]['median_s']:.4f}s, "
+                  f"linhas={results[chave]['rows']})", flush=True)
+
+    saida = {'environment': environment(), 'results': results}
+
+    with open(args.output, 'w') as file:
+        json.dump(saida, file, indent=2)
+
+    if args.save_baseline:
+
+        with open(args.baseline, 'w') as file:
+            json.dump(saida, file, indent=2)
+
+        print(f"Baseline gravado em {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"Sem baseline em {args.baseline}; use --save-baseline para criar")
+        return
+
+    with open(args.baseline, 'r') as file:
+        baseline = json.load(file)
+
+    referencia, atual = baseline['environment'], saida['environment']
+
+    diferentes = {k: (referencia.get(k), atual[k])
+                  for k in ('python', 'pandas', 'numpy', 'prophet', 'streamlit', 'cpus')
+                  if referencia.get(k) != atual[k]}
+
+    if diferentes:
+        print(f"Ambiente diferente do baseline: {diferentes}")
+
+    thresholds = {nome: float(valor) for nome, valor in (item.split('=') for item in args.thresholds)}
+
+    regressoes = compare(results, baseline['results'], args.threshold, thresholds, args.min_delta)
+
+    if regressoes:
+        print(f"\n{len(regressoes)} regressão(ões): {', '.join(regressoes)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
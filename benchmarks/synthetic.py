@@ -0,0 +1,47 @@
+# coding: utf-8
+
+# Séries sintéticas para os benchmarks: o histórico tratado real é estendido para
+# trás no tempo até `factor` vezes o seu tamanho, repetindo as variações diárias
+# observadas, para expor o comportamento com históricos mais longos. Quando o
+# calendário diário passaria do limite de datas do pandas (ano 1677) a série
+# sintética passa a ser horária; o que importa nos benchmarks é o número de linhas.
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pipeline_carga_dados.artifacts import current_path  # noqa: E402
+from pipeline_carga_dados.storage import read_refined  # noqa: E402
+
+SERIES_DIR = os.path.join(ROOT, 'shared', 'series', 'petro')
+
+
+def load_history():
+    # refined da versão publicada
+    return read_refined(os.path.join(current_path(SERIES_DIR), 'refined_data'))
+
+
+def scaled_history(factor, df=None):
+    # DataFrame diário no formato do refined (ds, y, unique_id) com factor x o tamanho
+    df = load_history() if df is None else df
+
+    if factor == 1:
+        return df
+
+    n = len(df) * factor
+    # retornos sem tendência, para que repetir o histórico não leve o preço a zero
+    retornos = np.diff(np.log(df['y'].to_numpy()))
+    retornos = retornos - retornos.mean()
+    retornos = np.resize(retornos, n - 1)
+
+    # a série termina no mesmo último preço do histórico real
+    log_y = np.log(df['y'].iloc[-1]) - np.concatenate(([0.0], np.cumsum(retornos[::-1])))[::-1]
+
+    ds = pd.date_range(end=df['ds'].iloc[-1], periods=n, freq='D' if n < 150 * 365 else 'H')
+
+    return pd.DataFrame({'ds': ds, 'y': np.exp(log_y).round(2), 'unique_id': df['unique_id'].iloc[0]})
@@ -0,0 +1,257 @@
+# coding: utf-8
+
+# Funções e caches compartilhados pelas páginas do app (app.py e pages/). Os caches do
+# Streamlit são indexados pela função, então ficam definidos aqui uma única vez e
+# valem para todas as páginas e sessões.
+#
+# Dependências pesadas são importadas só quando usadas: o Prophet apenas quando uma
+# previsão ao vivo é pedida (load_model) e o plotly apenas pelas páginas com gráficos.
+
+import datetime
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+from downsample import downsample
+from model_cache import ModelCache
+from range_stats import RangeStats
+from pipeline_carga_dados import artifacts, model_format, prediction, storage, tracing
+
+import warnings
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+# Artefatos da série exibida (o pipeline publica uma pasta por série em shared/series)
+SERIES_DIR = os.path.join('shared', 'series', os.environ.get('SERIES_ID', 'petro'))
+
+# Máximo de pontos enviados ao navegador no gráfico da série histórica
+CHART_POINT_BUDGET = int(os.environ.get('CHART_POINT_BUDGET', 2000))
+
+# Modo da previsão ao vivo (full, sampled, none ou analytic; ver pipeline_carga_dados/prediction.py)
+PREDICT_MODE = os.environ.get('PREDICT_MODE', 'none')
+
+TITLE = 'Preço por barril do petróleo bruto Brent (FOB) :chart:'
+
+MIN_MAX_RANGE = (datetime.datetime(1987, 5, 20),
+                 datetime.datetime(2024, 7, 1))
+
+
+def load_model(path):
+    # Formato binário mapeado na memória (pipeline_carga_dados/model_format.py) ou o
+    # JSON das versões publicadas antes dele
+    m = model_format.load(path)  # Load model
+
+    # o app mostra só o yhat: por padrão a previsão ao vivo não simula intervalos
+    return prediction.Predictor(m, prediction.read_calibration(os.path.dirname(path)), mode=PREDICT_MODE)
+
+
+def artifact(release, relpath):
+    # Caminho de um arquivo da versão publicada descrita pelo manifesto
+    return artifacts.version_path(SERIES_DIR, release['version'], *relpath.split('/'))
+
+
+def artifact_hash(release, relpath):
+    # Hash do arquivo no manifesto, usado como chave dos caches que dependem só dele
+    return release['files'][relpath]['sha256']
+
+
+def locate_model():
+    # Modelo da versão publicada e a chave de versão usada pelo ModelCache
+    release = artifacts.current_manifest(SERIES_DIR)
+    relpath = model_format.model_relpath(release['files'])
+
+    return artifact(release, relpath), artifact_hash(release, relpath)
+
+
+def current_release():
+    # Versão publicada pelo pipeline: a cada rerun só CURRENT e o manifesto são lidos.
+    # Tempo de cada seção vai para TRACE_DIR (ver pipeline_carga_dados/tracing.py), se definido
+    with tracing.stage('load', section='manifest'):
+        return artifacts.current_manifest(SERIES_DIR)
+
+
+# Parâmetros iniciados com _ ficam fora da chave dos caches: os caches são indexados
+# pelo hash do manifesto, então uma versão nova com o mesmo conteúdo reaproveita o que
+# já está em memória
+@st.cache_resource(max_entries=2)
+def price_dataset(_path, versao):
+    # Série inteira da versão publicada como tabela Arrow (Data, Preço, unique_id), lida
+    # uma vez por processo. A tabela é imutável: as sessões recebem fatias (slice/select)
+    # que apontam para os mesmos buffers, sem cópias por sessão
+    df = storage.read_refined(_path).rename(columns={'ds': 'Data', 'y': 'Preço'})
+
+    return pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata().combine_chunks()
+
+
+def column(tabela, nome):
+    # Coluna numérica ou de datas como array numpy somente leitura, sem cópia
+    coluna = tabela.column(nome)
+    coluna = coluna.chunk(0) if coluna.num_chunks == 1 else coluna.combine_chunks()
+
+    return coluna.to_numpy(zero_copy_only=False)
+
+
+def period_slice(_path, inicio, fim, versao):
+    # Linhas do período [inicio, fim): posições pela busca binária do índice e fatia
+    # da tabela compartilhada
+    i, j = price_index(_path, versao).bounds(inicio, fim)
+
+    return price_dataset(_path, versao).slice(i, j - i)
+
+
+@st.cache_data
+def historical_series(_path, inicio, fim, budget, versao):
+    # Série do período selecionado reduzida a no máximo `budget` pontos (mínimo e
+    # máximo de cada bloco); períodos curtos voltam na resolução diária
+    periodo = period_slice(_path, inicio, fim, versao)
+    df = pd.DataFrame({'Data': column(periodo, 'Data'), 'Preço': column(periodo, 'Preço')}, copy=False)
+
+    return downsample(df, x='Data', y='Preço', n_out=budget)
+
+
+def period_filter():
+    # Slider do período na barra lateral. O valor escolhido fica no session_state para
+    # ser mantido ao trocar de página
+    with st.sidebar:
+        selected_min, selected_max = st.slider(
+            "Período",
+            value=st.session_state.get('periodo', MIN_MAX_RANGE),
+            min_value=MIN_MAX_RANGE[0],
+            max_value=MIN_MAX_RANGE[1])
+
+    st.session_state['periodo'] = (selected_min, selected_max)
+
+    return selected_min, selected_max
+
+
+def filtered_period(release, selected_min, selected_max):
+    # Fatia (Arrow, somente leitura) do período escolhido
+    with tracing.stage('filter', section='periodo') as etapa:
+        periodo = period_slice(artifact(release, 'refined_data'), selected_min, selected_max, release['hash'])
+        etapa['rows'] = periodo.num_rows
+
+    return periodo
+
+
+@st.cache_resource(max_entries=4)
+def price_index(_path, versao):
+    # Índice de estatísticas por período da série inteira (range_stats.py), montado uma
+    # vez por versão dos dados e compartilhado por todas as sessões
+    # as colunas são as da tabela compartilhada (price_dataset), sem outra cópia da série
+    tabela = price_dataset(_path, versao)
+
+    return RangeStats(column(tabela, 'Data'), column(tabela, 'Preço'))
+
+
+def kpis(release, selected_min, selected_max):
+    # Mínimo, média e máximo do período direto do índice, sem filtrar o DataFrame
+    with tracing.stage('kpi', section='periodo') as etapa:
+        stats = price_index(artifact(release, 'refined_data'), release['hash']).stats(selected_min, selected_max)
+        etapa['rows'] = stats['rows']
+
+    coluna1, coluna2, coluna3 = st.columns(3)
+    with coluna1:
+        st.metric('Preço Mínimo', stats['min'])
+    with coluna2:
+        st.metric('Preço Médio', round(float(stats['mean']), 2))
+    with coluna3:
+        st.metric('Preço Máximo', stats['max'])
+
+
+@st.cache_resource
+def get_model_cache():
+    # Um único cache do modelo por processo, compartilhado entre as sessões
+    return ModelCache(locate_model, load_model)
+
+
+@st.cache_data
+def load_forecast_grid(_path, versao):
+    # Grade de previsão pré-calculada pelo pipeline, indexada pela data.
+    # O hash do arquivo entra na chave do cache para recarregar quando o pipeline publicar outra
+    return pd.read_parquet(_path).set_index('ds')
+
+
+def forecast_for_date(release, data):
+    # Consulta a grade pré-calculada; fora do horizonte cai na previsão ao vivo
+    if 'forecast_grid.parquet' in release['files']:
+        grid = load_forecast_grid(artifact(release, 'forecast_grid.parquet'),
+                                  artifact_hash(release, 'forecast_grid.parquet'))
+
+        if data in grid.index:
+            return grid.loc[data, 'yhat']
+
+    model = get_model_cache().get()
+
+    return model.predict(pd.DataFrame({'ds': [data]}))['yhat'].values[0]
+
+
+@st.cache_data
+def load_rollup(_path, versao):
+    # Agregados por ano/mês/semana publicados pelo pipeline (rollups/ da versão publicada)
+    return pd.read_parquet(_path)
+
+
+def rollup(release, grain):
+    relpath = f'rollups/{grain}.parquet'
+
+    return load_rollup(artifact(release, relpath), artifact_hash(release, relpath))
+
+
+def annual_variation(_path, versao):
+    # Preço médio e variação percentual por ano (agregado anual do pipeline)
+    df_ano = load_rollup(_path, versao)
+
+    return pd.DataFrame({'Data': df_ano['ds'].dt.year,
+                         'Preço': df_ano['mean'].round(2),
+                         'percentual': df_ano['pct_change'].round(2)})
+
+
+@st.cache_resource
+def highlight_figure(_path, ano_inicio, ano_fim, versao, tickangle=45, height=None, width=None):
+    # Gráfico de preço x variação percentual da aba Highlights para o intervalo de anos.
+    # Fica em cache por processo (chave: intervalo e versão do agregado anual), então
+    # após o primeiro acesso todas as sessões reaproveitam a mesma figura
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    df_agrupado = annual_variation(_path, versao)
+    df_intervalo = df_agrupado[df_agrupado['Data'].between(ano_inicio, ano_fim)]
+
+    fig = px.line(df_intervalo, x='Data', y='Preço',
+                  title='Preço Petróleo bruto X Variação percentual')
+    fig.update_layout(xaxis_title='Data', yaxis_title='Preço',
+                      height=height, width=width)
+
+    # Série de percentuais como gráfico de barras, vermelho para variação negativa
+    fig.add_trace(go.Bar(x=df_intervalo['Data'], y=df_intervalo['percentual'],
+                         marker=dict(color=np.where(df_intervalo['percentual'] < 0, 'red', 'green')),
+                         name='Percentuais Positivos'))
+
+    # Um tick por ano; as grades verticais são as próprias linhas de grade do eixo x
+    fig.update_xaxes(tickangle=tickangle, tickmode='array', tickvals=df_intervalo['Data'],
+                     showgrid=True, gridcolor='gray', gridwidth=1)
+
+    # Legendas: o preço e a legenda específica dos percentuais negativos
+    fig.update_traces(name='Preço', showlegend=True, selector=dict(type='scatter'))
+    fig.add_trace(go.Bar(x=[None], y=[None], marker=dict(color='red'),
+                         name='Percentuais Negativos'))
+
+    return fig
+
+
+@st.cache_resource(max_entries=8)
+def converte_csv(_path, inicio, fim, versao):
+    # CSV do período (Data, Preço); os bytes são imutáveis, então o mesmo arquivo serve
+    # a todas as sessões que exportam o mesmo período da mesma versão
+    periodo = period_slice(_path, inicio, fim, versao).select(['Data', 'Preço'])
+
+    return periodo.to_pandas().to_csv(index=False).encode('latin1')
+
+
+def mensagem_sucesso():
+    sucesso = st.success("Download concluído", icon="✅")
+    time.sleep(5)
+    sucesso.empty()
@@ -0,0 +1,85 @@
+# coding: utf-8
+
+# Redução de pontos para os gráficos de linha da série histórica.
+# Os dois métodos devolvem os índices dos pontos mantidos (sempre incluindo o
+# primeiro e o último), então a mesma seleção serve para qualquer coluna.
+#
+# - minmax: divide a série em (n_out - 2)/2 blocos e mantém o mínimo e o máximo de cada
+#   um; totalmente vetorizado e preserva os picos e vales da série.
+# - lttb: Largest-Triangle-Three-Buckets, mantém em cada bloco o ponto que forma o
+#   maior triângulo com o ponto escolhido no bloco anterior e a média do seguinte.
+
+import numpy as np
+
+
+def minmax_indices(y, n_out):
+    n = len(y)
+
+    if n <= n_out or n_out < 4:
+        return np.arange(n)
+
+    n_buckets = (n_out - 2) // 2
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+
+    # matriz (blocos x tamanho do maior bloco); blocos menores repetem o último índice
+    idx = edges[:-1, None] + np.arange(np.diff(edges).max())
+    idx = np.minimum(idx, edges[1:, None] - 1)
+
+    valores = y[idx]
+    linhas = np.arange(n_buckets)
+
+    keep = np.concatenate(([0, n - 1],
+                           idx[linhas, valores.argmin(axis=1)],
+                           idx[linhas, valores.argmax(axis=1)]))
+
+    return np.unique(keep)
+
+
+def lttb_indices(x, y, n_out):
+    n = len(y)
+
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # n_out - 2 blocos entre o primeiro e o último ponto
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    # média de x e y de cada bloco, calculada de uma vez; o "bloco seguinte" do
+    # último é o próprio último ponto
+    contagem = np.diff(edges)
+    media_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1]) / contagem, x[-1])
+    media_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1]) / contagem, y[-1])
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        inicio, fim = edges[i], edges[i + 1]
+
+        area = np.abs((x[a] - media_x[i + 1]) * (y[inicio:fim] - y[a])
+                      - (x[a] - x[inicio:fim]) * (media_y[i + 1] - y[a]))
+
+        a = inicio + int(area.argmax())
+        keep[i + 1] = a
+
+    return keep
+
+
+def downsample(df, x, y, n_out, method='minmax'):
+    # Reduz o DataFrame a no máximo ~n_out linhas; abaixo disso devolve o próprio df
+    if len(df) <= n_out:
+        return df
+
+    valores_y = df[y].to_numpy()
+
+    if method == 'lttb':
+        idx = lttb_indices(df[x].to_numpy().astype(np.int64), valores_y, n_out)
+    else:
+        idx = minmax_indices(valores_y, n_out)
+
+    return df.iloc[idx]
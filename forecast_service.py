@@ -0,0 +1,385 @@
+# coding: utf-8
+
+# Serviço HTTP de previsão para outros sistemas, ao lado do app.py.
+#
+#   GET /forecast?date=2024-03-01                  previsão de um dia
+#   GET /forecast?start=2024-03-01&end=2024-03-31  previsão diária do intervalo (inclusivo)
+#   GET /health                                    versão do modelo e contadores
+#
+# O modelo publicado (shared/series/<SERIES_ID>, ver pipeline_carga_dados/artifacts.py)
+# é carregado uma vez pelo ModelCache e recarregado em segundo plano quando o pipeline
+# publica outra versão; o CURRENT e o manifesto são consultados no máximo a cada
+# RELOAD_CHECK_SECONDS.
+#
+# As respostas de cada dia ficam num cache LRU indexado por (versão do modelo, data),
+# então uma versão nova nunca devolve previsões da anterior. Os dias que não estão no
+# cache vão para o PredictBatcher: as requisições que chegam numa janela de
+# BATCH_WINDOW_MS milissegundos são juntadas numa única chamada vetorizada de
+# model.predict() com as datas distintas de todas elas. Os intervalos saem, por padrão,
+# da fórmula calibrada do modo analytic (PREDICT_MODE, ver pipeline_carga_dados/prediction.py).
+#
+#   python forecast_service.py [--host 0.0.0.0] [--port 8502]
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from model_cache import ModelCache
+from pipeline_carga_dados import artifacts, model_format, prediction
+
+SERIES_DIR = os.path.join('shared', 'series', os.environ.get('SERIES_ID', 'petro'))
+
+FORECAST_PORT = int(os.environ.get('FORECAST_PORT', 8502))
+
+# Janela em que requisições simultâneas são juntadas num único predict()
+BATCH_WINDOW_MS = float(os.environ.get('BATCH_WINDOW_MS', 5))
+
+# Máximo de datas distintas por chamada do predict()
+BATCH_MAX_DATES = int(os.environ.get('BATCH_MAX_DATES', 4096))
+
+# Dias mantidos no cache LRU de respostas
+LRU_SIZE = int(os.environ.get('LRU_SIZE', 8192))
+
+# Intervalo mínimo entre consultas ao CURRENT/manifesto para detectar um modelo novo
+RELOAD_CHECK_SECONDS = float(os.environ.get('RELOAD_CHECK_SECONDS', 1.0))
+
+# Maior intervalo aceito numa consulta por período
+MAX_RANGE_DAYS = int(os.environ.get('MAX_RANGE_DAYS', 731))
+
+# Modo da previsão (ver pipeline_carga_dados/prediction.py): por padrão o intervalo pela
+# fórmula calibrada, sem as simulações do Prophet
+PREDICT_MODE = os.environ.get('PREDICT_MODE', 'analytic')
+
+COLUMNS = ['yhat', 'yhat_lower', 'yhat_upper']
+
+
+def load_model(path):
+
+    model = model_format.load(path)
+
+    return prediction.Predictor(model, prediction.read_calibration(os.path.dirname(path)), mode=PREDICT_MODE)
+
+
+class ModelLocator:
+    # locate() do ModelCache com o resultado guardado por `interval` segundos, para não
+    # ler o CURRENT e o manifesto a cada requisição
+
+    def __init__(self, series_dir, interval=RELOAD_CHECK_SECONDS):
+        self.series_dir = series_dir
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self._valor = None
+        self._lido = 0.0
+
+    def __call__(self):
+
+        with self._lock:
+
+            if self._valor is None or time.monotonic() - self._lido >= self.interval:
+
+                release = artifacts.current_manifest(self.series_dir)
+                relpath = model_format.model_relpath(release['files'])
+
+                self._valor = (artifacts.version_path(self.series_dir, release['version'], relpath),
+                               release['files'][relpath]['sha256'])
+                self._lido = time.monotonic()
+
+            return self._valor
+
+
+class LRUCache:
+
+    def __init__(self, maxsize=LRU_SIZE):
+        self.maxsize = maxsize
+
+        self._lock = threading.Lock()
+        self._dados = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chave):
+
+        with self._lock:
+
+            if chave not in self._dados:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._dados.move_to_end(chave)
+
+            return self._dados[chave]
+
+    def put(self, chave, valor):
+
+        with self._lock:
+
+            self._dados[chave] = valor
+            self._dados.move_to_end(chave)
+
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+
+    def stats(self):
+
+        with self._lock:
+            return {'size': len(self._dados), 'maxsize': self.maxsize,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+class PredictBatcher:
+    # Uma thread consome a fila de pedidos: a partir do primeiro pedido espera até
+    # `window` segundos por outros, faz um único predict() com as datas distintas de
+    # todos e resolve o Future de cada pedido com (chave do modelo, {data: previsão})
+
+    def __init__(self, models, window=BATCH_WINDOW_MS / 1000, max_dates=BATCH_MAX_DATES):
+        self.models = models
+        self.window = window
+        self.max_dates = max_dates
+
+        self._fila = queue.Queue()
+
+        self.batches = 0
+        self.requests = 0
+        self.dates = 0
+
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, datas):
+        future = Future()
+
+        self._fila.put((datas, future))
+
+        return future
+
+    def _collect(self):
+        pedidos = [self._fila.get()]
+        datas = set(pedidos[0][0])
+
+        limite = time.monotonic() + self.window
+
+        while len(datas) < self.max_dates:
+
+            restante = limite - time.monotonic()
+
+            if restante <= 0:
+                break
+
+            try:
+                pedido = self._fila.get(timeout=restante)
+
+            except queue.Empty:
+                break
+
+            pedidos.append(pedido)
+            datas.update(pedido[0])
+
+        return pedidos, sorted(datas)
+
+    def _run(self):
+
+        while True:
+
+            pedidos, datas = self._collect()
+
+            try:
+
+                model, chave = self.models.current()
+
+                forecast = model.predict(pd.DataFrame({'ds': datas}))
+
+                linhas = dict(zip(forecast['ds'], forecast[COLUMNS].to_dict('records')))
+
+            except Exception as err:
+
+                for _, future in pedidos:
+                    future.set_exception(err)
+
+                continue
+
+            self.batches += 1
+            self.requests += len(pedidos)
+            self.dates += len(datas)
+
+            for pedido, future in pedidos:
+                future.set_result((chave, {data: linhas[data] for data in pedido}))
+
+    def stats(self):
+
+        return {'batches': self.batches, 'requests': self.requests, 'dates': self.dates,
+                'window_ms': self.window * 1000}
+
+
+class ForecastService:
+
+    def __init__(self, series_dir=SERIES_DIR):
+        self.models = ModelCache(ModelLocator(series_dir), load_model)
+        self.cache = LRUCache()
+        self.batcher = PredictBatcher(self.models)
+
+    def forecast(self, datas):
+        # Previsões dos dias pedidos: do cache quando possível, o resto num lote
+        _, chave = self.models.current()
+
+        resultado = {}
+        faltando = []
+
+        for data in datas:
+
+            linha = self.cache.get((chave, data))
+
+            if linha is None:
+                faltando.append(data)
+            else:
+                resultado[data] = linha
+
+        if faltando:
+
+            chave_lote, novos = self.batcher.submit(faltando).result()
+
+            # modelo recarregado no meio tempo: todos os dias são recalculados com ele,
+            # para a resposta não misturar versões
+            if chave_lote != chave:
+                resultado = {}
+                chave_lote, novos = self.batcher.submit(datas).result()
+
+            for data, linha in novos.items():
+                self.cache.put((chave_lote, data), linha)
+
+            resultado.update(novos)
+            chave = chave_lote
+
+        return chave, [{'ds': data.strftime('%Y-%m-%d'), **{c: json_number(resultado[data][c]) for c in COLUMNS}}
+                       for data in datas]
+
+    def stats(self):
+
+        return {'model': self.models.stats(), 'cache': self.cache.stats(), 'batcher': self.batcher.stats()}
+
+
+def json_number(valor):
+    # NaN não é JSON válido: vai como null
+    return None if pd.isna(valor) else round(float(valor), 4)
+
+
+def parse_date(texto):
+    # Dia da data informada, sem fuso: as datas do modelo e do cache são tz-naive, então
+    # 2024-03-01T10:00-03:00 é o dia 2024-03-01
+    data = pd.Timestamp(texto)
+
+    # '', 'NaT' e 'nat' viram NaT sem erro; sem esta verificação a data chegaria à previsão
+    if pd.isna(data):
+        raise ValueError(f'data inválida: {texto!r}')
+
+    if data.tzinfo is not None:
+        data = data.tz_localize(None)
+
+    return data.normalize()
+
+
+def parse_dates(query):
+    # date=AAAA-MM-DD ou start=...&end=... (inclusivo)
+    if 'date' in query:
+        return [parse_date(query['date'][0])]
+
+    if 'start' in query and 'end' in query:
+
+        datas = pd.date_range(parse_date(query['start'][0]), parse_date(query['end'][0]), freq='D')
+
+        if len(datas) == 0 or len(datas) > MAX_RANGE_DAYS:
+            raise ValueError(f'o intervalo deve ter de 1 a {MAX_RANGE_DAYS} dias')
+
+        return list(datas)
+
+    raise ValueError('informe date ou start e end')
+
+
+def make_handler(service):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def send_json(self, status, corpo):
+            dados = json.dumps(corpo, allow_nan=False).encode()
+
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+
+            if url.path == '/health':
+                self.send_json(200, service.stats())
+                return
+
+            if url.path != '/forecast':
+                self.send_json(404, {'error': 'não encontrado'})
+                return
+
+            try:
+                datas = parse_dates(parse_qs(url.query))
+
+            except ValueError as err:
+                self.send_json(400, {'error': str(err)})
+                return
+
+            try:
+                chave, previsoes = service.forecast(datas)
+
+            except Exception as err:
+                self.send_json(503, {'error': str(err)})
+                return
+
+            self.send_json(200, {'model': chave[:12], 'forecast': previsoes})
+
+        def log_message(self, format, *args):
+            # sem uma linha de log por requisição
+            pass
+
+    return Handler
+
+
+class ForecastServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    # fila de conexões do listen(): com o padrão (5) conexões simultâneas além disso são
+    # recusadas e o cliente só tenta de novo depois de ~1s
+    request_queue_size = 128
+
+
+def make_server(host='127.0.0.1', port=FORECAST_PORT, service=None):
+
+    return ForecastServer((host, port), make_handler(service or ForecastService()))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=FORECAST_PORT)
+    args = parser.parse_args()
+
+    service = ForecastService()
+
+    # carrega o modelo antes de aceitar conexões
+    service.models.get()
+
+    server = make_server(args.host, args.port, service)
+
+    print(f"Serviço de previsão em http://{args.host}:{args.port}/forecast")
+
+    server.serve_forever()
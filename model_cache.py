@@ -0,0 +1,88 @@
+# coding: utf-8
+
+# Cache do modelo serializado compartilhado por todas as sessões do Streamlit.
+# O modelo é carregado uma vez por processo; a cada consulta `locate()` informa o
+# caminho do modelo publicado e uma chave da versão (o hash do arquivo no manifesto,
+# ver pipeline_carga_dados/artifacts.py) e, quando a chave muda, a nova versão é carregada
+# numa thread em segundo plano. Enquanto isso as consultas em andamento continuam
+# usando o modelo anterior.
+
+import threading
+
+
+class ModelCache:
+
+    def __init__(self, locate, loader):
+        self.locate = locate
+        self.loader = loader
+        self.path = None
+
+        self._lock = threading.Lock()
+        self._model = None
+        self._key = None
+        self._reloading = False
+
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.errors = 0
+
+    def get(self):
+
+        return self.current()[0]
+
+    def current(self):
+        # (modelo, chave da versão do modelo devolvido); durante uma recarga a chave é
+        # a do modelo anterior, ainda em uso
+        path, key = self.locate()
+
+        with self._lock:
+            model = self._model
+
+            if model is not None:
+                self.hits += 1
+
+                if key != self._key and not self._reloading:
+                    self._reloading = True
+                    threading.Thread(target=self._reload, args=(path, key), daemon=True).start()
+
+                return model, self._key
+
+        # primeira carga do processo: bloqueia apenas quem chegou antes do modelo existir
+        with self._lock:
+            if self._model is None:
+                self.misses += 1
+                self._model = self.loader(path)
+                self._key = key
+                self.path = path
+            else:
+                self.hits += 1
+
+            return self._model, self._key
+
+    def _reload(self, path, key):
+        try:
+            model = self.loader(path)
+
+        except Exception as err:
+            # arquivo ainda sendo gravado ou inválido: mantém o modelo atual e tenta de novo
+            # na próxima consulta
+            print(f"Falha ao recarregar o modelo {path}: {err}")
+
+            with self._lock:
+                self.errors += 1
+                self._reloading = False
+
+            return
+
+        with self._lock:
+            self._model = model
+            self._key = key
+            self.path = path
+            self.reloads += 1
+            self._reloading = False
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'reloads': self.reloads,
+                    'errors': self.errors, 'key': self._key, 'path': self.path}
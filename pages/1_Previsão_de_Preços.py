@@ -0,0 +1,41 @@
+# coding: utf-8
+
+# Previsão de preços: consulta a grade de previsão publicada e, fora dela, o modelo
+# (o Prophet só é importado nesse caso, ver dashboard.load_model).
+
+import streamlit as st
+import pandas as pd
+
+from dashboard import TITLE, current_release, forecast_for_date, get_model_cache, kpis, period_filter
+from pipeline_carga_dados import tracing
+
+st.set_page_config(page_title='Previsão de Preços')
+
+# Título ----------------------------------------------------------
+st.title(TITLE)
+
+release = current_release()
+
+# Filtro -------------------------------------------------------
+selected_min, selected_max = period_filter()
+# Visual --------------------------------------------------------
+
+# KPI -----------
+kpis(release, selected_min, selected_max)
+
+# Previsão
+st.write("### Escolha uma data para ver o preço previsto:")
+d = st.date_input("Data", value=None, format='DD/MM/YYYY')
+
+if st.button('Enviar') and d is not None:
+    with tracing.stage('predict', section='previsao'):
+        final_pred = forecast_for_date(release, pd.Timestamp(d))
+    st.write('O preço previsto para a data selecionada é:',
+             round(final_pred, 2))
+
+# contadores do cache do modelo, visíveis com ?debug=1 na URL
+if st.query_params.get('debug'):
+    st.json(get_model_cache().stats())
+
+# totais por seção para o node exporter (TRACE_DIR/app.prom)
+tracing.write_textfile('app')
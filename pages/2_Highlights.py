@@ -0,0 +1,224 @@
+# coding: utf-8
+
+# Highlights: preço médio e variação percentual por ano nos períodos de maior flutuação.
+
+import streamlit as st
+
+from dashboard import TITLE, annual_variation, artifact, artifact_hash, current_release, highlight_figure
+from pipeline_carga_dados import tracing
+
+st.set_page_config(page_title='Highlights')
+
+# Título ----------------------------------------------------------
+st.title(TITLE)
+
+release = current_release()
+
+# Média dos preços por ano e variação percentual entre os anos, lidas do agregado anual publicado pelo pipeline.
+# A variação percentual é atribuída à coluna 'percentual', com o primeiro valor definido como 0 pelo pipeline
+caminho_ano = artifact(release, 'rollups/year.parquet')
+versao_ano = artifact_hash(release, 'rollups/year.parquet')
+df_agrupado = annual_variation(caminho_ano, versao_ano)
+
+# Título do aplicativo
+st.subheader("Introdução")
+
+st.caption("Tornando-se uma das fontes de energia mais cruciais globalmente, o petróleo ainda desempenha um papel vital na base de diversas economias. "
+           "Atualmente, flutuações nos preços do barril no mercado global têm a capacidade de desencadear crises econômicas significativas. Assim como, fatores externos têm o potencial de impactar os valores do barril."
+           "Desde os grandes investidores até os consumidores comuns na cadeia econômica, todos se tornam suscetíveis às flutuações do \"diamante negro\".")
+
+# Gráfico com todos os anos
+with tracing.stage('chart', section='highlights_todos'):
+    st.plotly_chart(highlight_figure(caminho_ano,
+        df_agrupado['Data'].min(), df_agrupado['Data'].max(), versao_ano,
+        tickangle=100, height=600, width=1000))
+
+st.subheader("História")
+
+st.caption("A nossa análise se inicia em em 1987 e a primeira flutuação mais drástica dos preços que conseguimos identificar foi em 1991")
+
+with tracing.stage('chart', section='highlights_1990_1995'):
+    st.plotly_chart(highlight_figure(caminho_ano, 1990, 1995, versao_ano))
+
+st.subheader("Guerra do Golfo")
+
+st.caption("""
+A Guerra do Golfo, que ocorreu entre agosto de 1990 e fevereiro de 1991, teve um impacto significativo nos preços do petróleo devido a vários fatores:
+
+1. **Invasão do Kuwait:** O conflito começou quando o Iraque, liderado por Saddam Hussein, invadiu o Kuwait em agosto de 1990. Isso levou a uma resposta internacional liderada pelos Estados Unidos.
+
+2. **Interrupção da produção:** A invasão resultou em uma interrupção significativa na produção de petróleo no Kuwait, um importante produtor na região. Isso reduziu a oferta global de petróleo, levando a preocupações sobre uma possível escassez.
+
+3. **Temor de expansão do conflito:** A comunidade internacional temia que o conflito se espalhasse para outros países produtores de petróleo na região do Golfo Pérsico, como a Arábia Saudita e os Emirados Árabes Unidos. Esses temores aumentaram a incerteza no mercado de petróleo.
+
+4. **Restrições à produção iraquiana:** Durante a guerra, a coalizão liderada pelos Estados Unidos impôs sanções ao Iraque, incluindo restrições severas à sua produção e exportação de petróleo. Isso contribuiu para uma redução adicional na oferta global.
+
+5. **Aumento da demanda por segurança energética:** A instabilidade na região do Golfo Pérsico aumentou a percepção de risco para o fornecimento global de petróleo. Isso levou muitos países a buscar medidas para garantir sua segurança energética, como estoques estratégicos, o que aumentou a demanda por petróleo no curto prazo.
+
+Esses fatores combinados resultaram em uma diminuição da oferta e em preocupações sobre a estabilidade do fornecimento global de petróleo, levando a um aumento nos preços do petróleo durante e após a Guerra do Golfo. O impacto do conflito na região continuou a influenciar os mercados de petróleo nos anos subsequentes.
+""")
+
+st.subheader("Crise Imobiliária")
+
+st.caption("A segunda flutuação mais drástica dos preços foi em 2008:")
+
+with tracing.stage('chart', section='highlights_2007_2011'):
+    st.plotly_chart(highlight_figure(caminho_ano, 2007, 2011, versao_ano))
+
+st.caption("""
+
+1. **Colapso do Mercado Imobiliário:** A crise foi desencadeada por um colapso no mercado imobiliário dos EUA, marcado por hipotecas de alto risco (subprime) e uma bolha imobiliária que estourou.
+
+2. **Crise Financeira:** O colapso teve repercussões financeiras globais, levando a falências bancárias e uma crise sistêmica.
+
+**Impactos nos Preços do Petróleo:**
+
+1. **Redução da Demanda:** A crise resultou em uma recessão global, reduzindo a atividade econômica e a demanda por petróleo.
+
+2. **Queda nos Preços:** A diminuição da demanda contribuiu para a queda nos preços do petróleo, já que a oferta superava a demanda.
+
+**Preço do Petróleo e Impacto na Crise Imobiliária:**
+
+1. **Custo dos Insumos:** Os preços mais altos do petróleo antes da crise aumentaram os custos de construção e transporte, contribuindo para a pressão nos custos imobiliários.
+
+2. **Impacto na Economia Geral:** A alta nos preços do petróleo aumentou os custos de vida e contribuiu para a pressão inflacionária, afetando a capacidade de pagamento das hipotecas.
+
+**Variação de Preços:**
+
+1. **Círculo Vicioso:** A crise imobiliária e a recessão reduziram a demanda por petróleo, levando a uma queda nos preços. Por sua vez, a queda nos preços do petróleo afetou negativamente as economias dependentes do setor, contribuindo para a persistência da crise.
+
+A crise imobiliária e os preços do petróleo estavam interligados, com a recessão global afetando a demanda por petróleo e vice-versa. Esses eventos desencadearam um ciclo de retroalimentação negativa, contribuindo para a magnitude da crise econômica de 2008.
+""")
+
+st.subheader("Impactos nos Preços do Petróleo (2011-2017)")
+
+with tracing.stage('chart', section='highlights_2007_2017'):
+    st.plotly_chart(highlight_figure(caminho_ano, 2007, 2017, versao_ano))
+
+st.caption(
+    """
+        O período de 2011 a 2017 foi marcado por diversas mudanças e eventos que impactaram os preços do petróleo. 
+        Alguns dos fatores mais significativos incluem:
+
+        **Desaceleração econômica global:**
+        Como mencionamos no tópico superior, crise financeira global de 2008-2009 teve repercussões que se estenderam até 2011. A desaceleração econômica global 
+        afetou a demanda por petróleo, resultando em uma pressão de baixa nos preços.
+
+        **Produção de petróleo de xisto nos EUA:**
+        Durante esse período, houve um aumento significativo na produção de petróleo de xisto nos Estados Unidos. 
+        Isso foi impulsionado por avanços tecnológicos, como a perfuração horizontal e a fratura hidráulica (fracking). 
+        O aumento na produção dos EUA contribuiu para um aumento na oferta global de petróleo.
+
+        **Instabilidade geopolítica:**
+        Vários eventos geopolíticos contribuíram para a volatilidade nos preços do petróleo. Isso incluiu conflitos no Oriente 
+        Médio, como a Primavera Árabe, tensões no Golfo Pérsico e eventos relacionados à Rússia, que afetaram a oferta e a percepção 
+        de risco no mercado de petróleo.
+
+        **Decisões da OPEP (Organização dos Países Exportadores de Petróleo):**
+        A OPEP desempenhou um papel importante na gestão da produção global de petróleo. Decisões tomadas pelos países membros da 
+        OPEP, como cortes ou aumentos na produção, tiveram impacto direto nos preços do petróleo.
+
+        **Dólar americano e política monetária:**
+        A relação inversa entre o dólar americano e os preços das commodities, incluindo o petróleo, também influenciou os preços. 
+        Mudanças nas políticas monetárias e econômicas nos EUA afetaram a taxa de câmbio e, consequentemente, os preços do petróleo 
+        denominados em dólares.
+
+        **Inovações tecnológicas e eficiência energética:**
+        Avanços em eficiência energética e a crescente ênfase em fontes de energia alternativas contribuíram para uma mudança nas 
+        perspectivas de demanda futura por petróleo, impactando os preços.
+
+        **Acordo nuclear com o Irã:**
+        O acordo nuclear com o Irã em 2015 levou à suspensão de sanções econômicas, permitindo que o país aumentasse sua produção 
+        de petróleo. Isso também influenciou a oferta global e os preços do petróleo.
+
+        Esses são apenas alguns dos fatores que contribuíram para a variabilidade nos preços do petróleo durante o período de 2011 a 2017. 
+        É importante notar que os mercados de commodities, incluindo o petróleo, são altamente complexos e estão sujeitos a uma série de 
+        influências econômicas, geopolíticas e tecnológicas.
+        """
+)
+st.subheader("Impactos nos Preços do Petróleo (2019-2021)")
+
+with tracing.stage('chart', section='highlights_2018_2021'):
+    st.plotly_chart(highlight_figure(caminho_ano, 2018, 2021, versao_ano))
+
+st.caption("""
+
+        **Pandemia de COVID-19:**
+        A pandemia teve um impacto significativo na demanda global por petróleo, uma vez que as restrições de viagem e lockdowns 
+        em muitas partes do mundo reduziram drasticamente o consumo de combustíveis. A queda na demanda contribuiu para o excesso 
+        de oferta e pressionou os preços para baixo.
+
+        **Guerra de Preços entre Arábia Saudita e Rússia:**
+        Em março de 2020, a Arábia Saudita e a Rússia não conseguiram chegar a um acordo sobre os cortes na produção 
+        de petróleo para sustentar os preços em meio à queda da demanda global devido à pandemia de COVID-19. Como resposta, 
+        a Arábia Saudita aumentou sua produção e iniciou uma guerra de preços, inundando o mercado com petróleo, o que levou a 
+        uma queda acentuada nos preços.
+
+        **Acordo OPEP+ e Cortes na Produção:**
+        Em abril de 2020, a OPEP+ (Organização dos Países Exportadores de Petróleo e aliados) chegou a um acordo para reduzir a 
+        produção global de petróleo em resposta à crise induzida pela pandemia. Os cortes na produção ajudaram a estabilizar os 
+        preços após a queda inicial.
+
+        **Recuperação Econômica:**
+        Com o avanço das campanhas de vacinação contra a COVID-19 e a perspectiva de uma recuperação econômica global, a demanda 
+        por petróleo começou a se recuperar em 2021. A expectativa de uma maior demanda influenciou positivamente os preços do petróleo.
+
+
+
+        """
+           )
+st.subheader("Impactos nos Preços do Petróleo (2022-2023)")
+with tracing.stage('chart', section='highlights_2022_2023'):
+    st.plotly_chart(highlight_figure(caminho_ano, 2022, 2023, versao_ano))
+
+st.caption("""
+
+**Sanções à Rússia:**
+Desde a invasão da Ucrânia pela Rússia, o país tem enfrentado sanções internacionais com o objetivo de reduzir o comércio com seus parceiros. Isso tem contribuído para a escalada dos preços, uma vez que há preocupações de que as sanções à Rússia possam prejudicar o fornecimento global de energia. Além disso, mesmo antes da invasão, a oferta global já não conseguia acompanhar a demanda, devido à flexibilização das medidas contra a COVID-19, intensificando as preocupações em relação aos preços das commodities..
+
+**Alta nos Preços devido a Restrições na Oferta:**
+Os preços do petróleo atingiram o maior nível de 2023 devido às expectativas de oferta mais restrita, superando preocupações 
+com o crescimento econômico mais fraco e o aumento dos estoques dos EUA. 
+
+""")
+
+st.header("O que está acontecendo hoje: 2024")
+
+st.caption("A volatilidade nos preços do petróleo, que observamos diariamente, muitas vezes é influenciada pelos acontecimentos no Oriente Médio. Isso se deve à presença de cinco dos dez maiores produtores mundiais na região: Arábia Saudita, Iraque, Emirados Árabes Unidos, Irã e Kuwait. Além disso, duas das principais rotas comerciais globais passam por lá: o Estreito de Ormuz, responsável pelo transporte de mais de 3/10 da produção mundial de petróleo, e o Canal de Suez, que conecta o Mediterrâneo ao Mar Vermelho. A instabilidade na região, causada por conflitos como a guerra entre Israel e Hamas e confrontos no Iêmen, afeta diretamente essas rotas cruciais. Bloqueios temporários nesses pontos estratégicos podem ocorrer durante momentos de tensão, impactando significativamente o mercado global de petróleo.")
+
+st.header("Conclusão")
+
+st.caption(" Os preços do petróleo são influenciados por uma interação complexa de fatores econômicos, geopolíticos, tecnológicos e ambientais, resultando na volatilidade nos mercados de commodities. Tensões geopolíticas, condições econômicas globais, decisões da OPEP+, desastres naturais, dinâmicas de oferta e demanda, e desenvolvimentos na transição energética são todos elementos cruciais que moldam o cenário dos preços do petróleo. Essa complexidade destaca a necessidade de uma abordagem abrangente ao analisar e compreender as flutuações nos mercados energéticos.")
+
+st.header("Referência")
+
+# Substituindo URLs
+url_bbc1 = "https://www.bbc.com/portuguese/articles/cld19n1dzy7o"
+url_veja = "https://veja.abril.com.br/economia/a-nova-era-do-petroleo-comecou"
+url_brasil_escola = "https://brasilescola.uol.com.br/geografia/crise-financeira-global.htm"
+url_ibp = "https://www.ibp.org.br/observatorio-do-setor/analises/covid-19-e-os-impactos-sobre-o-mercado-de-petroleo/#:~:text=A%20disseminação%20do%20COVID-19,efeitos%20da%20pandemia%20na%20economia."
+url_cnn = "https://www.cnnbrasil.com.br/economia/entenda-por-que-o-preco-do-petroleo-disparou-com-a-guerra-entre-ucrania-e-russia/"
+url_pantheon = "https://pantheon.ufrj.br/bitstream/11422/830/3/DCSDuarte.pdf"
+url_bbc2 = "https://www.bbc.com/portuguese/internacional-51799906"
+
+# Configurando a data de acesso
+data_acesso = "22/01/2024"
+
+# Texto formatado
+st.write("BBC (Artigo 1). Disponível em:",
+         f"[<URL>]({url_bbc1}). Acesso em: {data_acesso}.")
+st.write("VEJA. Disponível em:",
+         f"[<URL>]({url_veja}). Acesso em: {data_acesso}.")
+st.write("BRASIL ESCOLA. Disponível em:",
+         f"[<URL>]({url_brasil_escola}). Acesso em: {data_acesso}.")
+st.write("INSTITUTO BRASILEIRO DE PETRÓLEO (IBP). Disponível em:",
+         f"[<URL>]({url_ibp}). Acesso em: {data_acesso}.")
+st.write("CNN Brasil. Disponível em:",
+         f"[<URL>]({url_cnn}). Acesso em: {data_acesso}.")
+st.write("Pantheon UFRJ (PDF). Disponível em:",
+         f"[<URL>]({url_pantheon}). Acesso em: {data_acesso}.")
+st.write("BBC (Artigo 2). Disponível em:",
+         f"[<URL>]({url_bbc2}). Acesso em: {data_acesso}.")
+
+# totais por seção para o node exporter (TRACE_DIR/app.prom)
+tracing.write_textfile('app')
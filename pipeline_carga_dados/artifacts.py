@@ -0,0 +1,225 @@
+# coding: utf-8
+
+# Publicação versionada dos artefatos de uma série (shared/series/<unique_id>/).
+#
+# Cada execução do pipeline grava numa pasta nova, versions/<versão>, criada com
+# hardlinks para os arquivos da versão publicada: só o que muda é regravado, sempre
+# num arquivo temporário seguido de os.replace, o que substitui o link sem tocar no
+# arquivo da versão anterior. No fim é gravado o manifesto da versão (hash, bytes e
+# linhas de cada arquivo e a marca d'água dos dados) e o arquivo CURRENT passa a
+# apontar para ela com um os.replace atômico. Quem lê (app, backtest) resolve CURRENT
+# e nunca vê uma versão pela metade; o hash do manifesto serve de versão dos caches
+# do app sem abrir nenhum Parquet. Versões antigas são apagadas mantendo as
+# KEEP_VERSIONS publicadas mais recentes.
+#
+# O módulo não depende do pipeline, para poder ser importado pelo app.
+
+import hashlib
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime
+
+import pyarrow.parquet as pq
+
+VERSIONS_DIR = 'versions'
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+
+# Versões publicadas mantidas no disco (a atual é sempre mantida)
+KEEP_VERSIONS = int(os.environ.get('KEEP_VERSIONS', 3))
+
+HASH_BLOCK = 1024 * 1024
+
+
+@contextmanager
+def atomic_path(filepath):
+    # Caminho temporário que substitui filepath de uma vez ao final do bloco; se o
+    # bloco falhar o arquivo original fica intacto
+    tmp = f'{filepath}.tmp{os.getpid()}'
+
+    try:
+        yield tmp
+        os.replace(tmp, filepath)
+
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def version_path(series_dir, version, *partes):
+
+    return os.path.join(series_dir, VERSIONS_DIR, version, *partes)
+
+
+def current_version(series_dir):
+
+    try:
+
+        with open(os.path.join(series_dir, CURRENT_FILE), 'r') as file:
+            return file.read().strip()
+
+    except FileNotFoundError:
+
+        return None
+
+
+def current_path(series_dir):
+    # Pasta da versão publicada, ou None se a série ainda não tem nenhuma
+    version = current_version(series_dir)
+
+    return None if version is None else version_path(series_dir, version)
+
+
+def read_manifest(version_dir):
+
+    with open(os.path.join(version_dir, MANIFEST_FILE), 'r') as file:
+        return json.load(file)
+
+
+def current_manifest(series_dir):
+
+    version_dir = current_path(series_dir)
+
+    return None if version_dir is None else read_manifest(version_dir)
+
+
+def stage_version(series_dir):
+    # Nova pasta de versão com hardlinks para todos os arquivos da versão atual
+    # (cópia, se o sistema de arquivos não aceitar links)
+    destino = version_path(series_dir, datetime.now().strftime('%Y%m%dT%H%M%S%f'))
+    origem = current_path(series_dir)
+
+    os.makedirs(destino)
+
+    if origem is None:
+        return destino
+
+    for raiz, _, arquivos in os.walk(origem):
+
+        pasta = os.path.join(destino, os.path.relpath(raiz, origem))
+        os.makedirs(pasta, exist_ok=True)
+
+        for nome in arquivos:
+
+            if nome == MANIFEST_FILE:
+                continue
+
+            try:
+                os.link(os.path.join(raiz, nome), os.path.join(pasta, nome))
+
+            except OSError:
+                shutil.copy2(os.path.join(raiz, nome), os.path.join(pasta, nome))
+
+    return destino
+
+
+def file_hash(filepath):
+
+    h = hashlib.sha256()
+
+    with open(filepath, 'rb') as file:
+        for bloco in iter(lambda: file.read(HASH_BLOCK), b''):
+            h.update(bloco)
+
+    return h.hexdigest()
+
+
+def describe(filepath):
+
+    entrada = {'sha256': file_hash(filepath), 'bytes': os.path.getsize(filepath)}
+
+    if filepath.endswith('.parquet'):
+        entrada['rows'] = pq.read_metadata(filepath).num_rows
+
+    return entrada
+
+
+def build_manifest(version_dir, previous_dir=None, **extra):
+    # Arquivos da versão indexados pelo caminho relativo. Os que continuam sendo o
+    # mesmo inode da versão anterior (hardlink não regravado) reaproveitam a entrada
+    # do manifesto anterior em vez de serem lidos de novo
+    anteriores = {}
+
+    if previous_dir is not None and os.path.exists(os.path.join(previous_dir, MANIFEST_FILE)):
+        anteriores = read_manifest(previous_dir)['files']
+
+    files = {}
+
+    for raiz, _, arquivos in os.walk(version_dir):
+
+        for nome in sorted(arquivos):
+
+            filepath = os.path.join(raiz, nome)
+            relpath = os.path.relpath(filepath, version_dir).replace(os.sep, '/')
+
+            if relpath == MANIFEST_FILE:
+                continue
+
+            anterior = None if previous_dir is None else os.path.join(previous_dir, relpath)
+
+            if relpath in anteriores and os.path.exists(anterior) and os.path.samefile(anterior, filepath):
+                files[relpath] = anteriores[relpath]
+            else:
+                files[relpath] = describe(filepath)
+
+    conteudo = json.dumps({relpath: entrada['sha256'] for relpath, entrada in sorted(files.items())})
+
+    return {'version': os.path.basename(os.path.normpath(version_dir)),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'hash': hashlib.sha256(conteudo.encode()).hexdigest(),
+            **extra,
+            'files': files}
+
+
+def check_keep(keep):
+    # keep conta a versão atual: com menos de 1, o contrato de manter N versões não vale
+    if keep < 1:
+        raise ValueError(f'keep deve ser pelo menos 1 (recebido {keep})')
+
+
+def publish(series_dir, version_dir, keep=KEEP_VERSIONS, **extra):
+    # Grava o manifesto, aponta CURRENT para a versão e apaga as versões antigas.
+    # keep é conferido antes de trocar o CURRENT
+    check_keep(keep)
+
+    manifest = build_manifest(version_dir, current_path(series_dir), **extra)
+
+    with atomic_path(os.path.join(version_dir, MANIFEST_FILE)) as tmp:
+        with open(tmp, 'w') as file:
+            json.dump(manifest, file, indent=2)
+
+    with atomic_path(os.path.join(series_dir, CURRENT_FILE)) as tmp:
+        with open(tmp, 'w') as file:
+            file.write(manifest['version'])
+
+    gc_versions(series_dir, keep)
+
+    return manifest
+
+
+def discard(version_dir):
+    # Descarta uma versão que não chegou a ser publicada
+    shutil.rmtree(version_dir, ignore_errors=True)
+
+
+def gc_versions(series_dir, keep=KEEP_VERSIONS):
+    # Mantém a versão atual e as `keep` publicadas mais recentes. Pastas sem manifesto
+    # mais novas que a atual podem ser de uma execução em andamento e ficam
+    check_keep(keep)
+
+    atual = current_version(series_dir)
+    pasta = os.path.join(series_dir, VERSIONS_DIR)
+
+    versoes = sorted(os.listdir(pasta))
+    publicadas = [v for v in versoes if os.path.exists(os.path.join(pasta, v, MANIFEST_FILE))]
+
+    manter = set(publicadas[-keep:]) | {atual}
+
+    removidas = [v for v in versoes if v not in manter and (v in publicadas or v < atual)]
+
+    for version in removidas:
+        shutil.rmtree(os.path.join(pasta, version), ignore_errors=True)
+
+    return removidas
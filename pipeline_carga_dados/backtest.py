@@ -0,0 +1,278 @@
+# coding: utf-8
+
+# Backtest com origens móveis e busca de hiperparâmetros do Prophet.
+#
+# Para cada combinação da grade (data de início do treino, changepoint_prior_scale,
+# modo e presença da sazonalidade anual) o modelo é treinado até cada origem e
+# avaliado nos `horizon` dias seguintes. Os ajustes são distribuídos entre todos os
+# núcleos com um pool de processos e as previsões ficam num cache indexado pelo hash
+# dos dados usados no fold e pelos parâmetros. As origens ficam numa grade fixa do
+# calendário (múltiplos de `step` dias a partir de ORIGIN_EPOCH), então dias novos não
+# mudam os folds existentes: uma nova execução só calcula a origem que entrou na grade
+# (uma a cada `step` dias) ou os folds cujos dados foram revisados, e o cache é
+# regravado sem as entradas que saíram da grade.
+# A configuração com menor erro médio é gravada em best_params.json e usada no
+# treino diário do pipeline.py. Cada série de series.json tem o seu próprio
+# backtest, em SHARED_DIR/series/<unique_id>/backtest.
+#
+#   python backtest.py [--folds 8] [--horizon 30] [--step 30] [--workers N] [--series petro ...]
+
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+
+import artifacts
+import baseline
+import storage
+from pipeline import BEST_PARAMS, REFINED_DATA, read_series, save_data, series_path, wmape
+
+BACKTEST_DIR = 'backtest'
+CACHE_FILE = 'cache.jsonl'
+RESULTS_FILE = 'results.parquet'
+BASELINE_RESULTS_FILE = 'baseline.parquet'
+
+GRID = {
+    'start_train': ['2010-01-01', '2015-01-01', '2018-01-01', '2020-01-01'],
+    'changepoint_prior_scale': [0.01, 0.05, 0.5],
+    'seasonality_mode': ['additive', 'multiplicative'],
+    'yearly_seasonality': [True, False],
+}
+
+# Início da grade de origens dos folds (ver fold_origins)
+ORIGIN_EPOCH = pd.Timestamp('2000-01-01')
+
+# série compartilhada com os processos do pool (definida no initializer)
+_serie = None
+
+
+def param_grid(grid=GRID):
+
+    chaves = list(grid)
+
+    return [dict(zip(chaves, valores)) for valores in itertools.product(*grid.values())]
+
+
+def fold_origins(last_date, folds, horizon, step, epoch=ORIGIN_EPOCH):
+    # Origens da mais recente para a mais antiga, numa grade fixa do calendário
+    # (ORIGIN_EPOCH + múltiplos de `step` dias): a mais recente é a última cujos
+    # `horizon` dias de avaliação já estão nos dados. Dias novos não deslocam as
+    # origens, então os folds anteriores mantêm as chaves do cache; a cada `step`
+    # dias entra uma origem nova e sai a mais antiga
+    ultima = (pd.Timestamp(last_date) - pd.Timedelta(days=horizon) - epoch).days // step
+
+    return [epoch + pd.Timedelta(days=(ultima - k) * step) for k in range(folds)]
+
+
+def fold_key(df, params, origin, horizon):
+    # hash dos dados efetivamente usados no fold (treino + avaliação) e dos parâmetros
+    fim = origin + pd.Timedelta(days=horizon)
+    recorte = df[(df['ds'] >= params['start_train']) & (df['ds'] <= fim)]
+
+    h = hashlib.sha256()
+    h.update(recorte['ds'].values.tobytes())
+    h.update(recorte['y'].values.tobytes())
+    h.update(json.dumps([params, str(origin), horizon], sort_keys=True).encode())
+
+    return h.hexdigest()
+
+
+def init_worker(serie):
+
+    global _serie
+    _serie = serie
+
+    warnings.filterwarnings('ignore')
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+
+
+def evaluate_fold(task):
+    # executado no pool: treina até a origem e prevê os `horizon` dias seguintes
+    key, params, origin, horizon = task
+
+    prophet_params = {k: v for k, v in params.items() if k != 'start_train'}
+
+    treino = _serie[(_serie['ds'] >= params['start_train']) & (_serie['ds'] <= origin)]
+
+    model = Prophet(**prophet_params, uncertainty_samples=0)
+    model.fit(treino)
+
+    futuro = pd.DataFrame({'ds': pd.date_range(origin + pd.Timedelta(days=1), periods=horizon, freq='D')})
+
+    return key, model.predict(futuro)['yhat'].tolist()
+
+
+def read_cache(cache_file):
+
+    cache = {}
+
+    if os.path.exists(cache_file):
+
+        with open(cache_file, 'r') as file:
+
+            for linha in file:
+                registro = json.loads(linha)
+                cache[registro['key']] = registro['yhat']
+
+    return cache
+
+
+def prune_cache(cache_file, cache, keys):
+    # Regrava o cache só com as chaves da execução atual: folds que saíram da grade,
+    # dados revisados ou outra configuração de --folds/--horizon/--step não voltam
+    usadas = {key: cache[key] for key in keys if key in cache}
+
+    if len(usadas) == len(cache):
+        return 0
+
+    with artifacts.atomic_path(cache_file) as tmp, open(tmp, 'w') as file:
+
+        for key, yhat in usadas.items():
+            file.write(json.dumps({'key': key, 'yhat': yhat}) + '\n')
+
+    return len(cache) - len(usadas)
+
+
+def run_backtest(df, unique_id, folds, horizon, step, workers=None, grid=GRID):
+
+    os.makedirs(series_path(unique_id, BACKTEST_DIR), exist_ok=True)
+
+    cache_file = series_path(unique_id, BACKTEST_DIR, CACHE_FILE)
+
+    origins = fold_origins(df['ds'].iloc[-1], folds, horizon, step)
+
+    tasks = [(fold_key(df, params, origin, horizon), params, origin, horizon)
+             for params in param_grid(grid) for origin in origins]
+
+    cache = read_cache(cache_file)
+    pendentes = [task for task in tasks if task[0] not in cache]
+
+    print(f"[{unique_id}] {len(tasks)} folds, {len(tasks) - len(pendentes)} em cache, {len(pendentes)} a calcular")
+
+    if pendentes:
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(df[['ds', 'y']],)) as pool, \
+                open(cache_file, 'a') as file:
+
+            for key, yhat in pool.map(evaluate_fold, pendentes, chunksize=1):
+                cache[key] = yhat
+                file.write(json.dumps({'key': key, 'yhat': yhat}) + '\n')
+                file.flush()
+
+    removidas = prune_cache(cache_file, cache, [key for key, _, _, _ in tasks])
+
+    if removidas:
+        print(f"[{unique_id}] {removidas} entradas fora da grade removidas do cache")
+
+    # erro de todos os folds de uma vez: matriz (folds x horizonte)
+    y = df.set_index('ds')['y']
+    y_true = np.array([y.loc[origin + pd.Timedelta(days=1):origin + pd.Timedelta(days=horizon)].values
+                       for _, _, origin, _ in tasks])
+    y_pred = np.array([cache[key] for key, _, _, _ in tasks])
+
+    erros = pd.DataFrame([params for _, params, _, _ in tasks])
+    erros['wmape'] = wmape(y_true, y_pred, axis=1)
+
+    chaves = list(grid)
+
+    results = (erros.groupby(chaves, sort=False)['wmape']
+               .agg(['mean', 'std', 'count']).reset_index()
+               .sort_values('mean', ignore_index=True))
+
+    return results
+
+
+def baseline_scores(df, folds, horizon, step, start_train):
+    # Erro dos modelos de baseline.py nas mesmas origens. Cada fold vira uma linha da
+    # matriz (folds x tempo), com a mesma janela de treino, e todos são previstos juntos
+    y = df.set_index('ds')['y']
+    origins = fold_origins(df['ds'].iloc[-1], folds, horizon, step)
+
+    janela = len(y.loc[start_train:min(origins)])
+
+    Y = np.array([y.loc[:origin].values[-janela:] for origin in origins])
+    y_true = np.array([y.loc[origin + pd.Timedelta(days=1):origin + pd.Timedelta(days=horizon)].values
+                       for origin in origins])
+
+    scores = []
+
+    for model in baseline.MODELS:
+        yhat, _, _ = baseline.forecast_matrix(Y, horizon, model)
+        erros = wmape(y_true, yhat, axis=1)
+        scores.append({'model': model, 'mean': erros.mean(), 'std': erros.std(), 'count': len(erros)})
+
+    return pd.DataFrame(scores).sort_values('mean', ignore_index=True)
+
+
+def save_best_params(results, unique_id):
+
+    melhor = results.iloc[0].drop(['mean', 'std', 'count']).to_dict()
+
+    # tipos nativos para o json (numpy.bool_/float64 não são serializáveis)
+    melhor = {k: v.item() if hasattr(v, 'item') else v for k, v in melhor.items()}
+
+    # temporário + os.replace: uma execução interrompida não deixa um JSON pela metade
+    # para o read_best_params do pipeline
+    with artifacts.atomic_path(series_path(unique_id, BEST_PARAMS)) as tmp, open(tmp, 'w') as file:
+
+        json.dump(melhor, file, indent=2)
+
+    return melhor
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--folds', type=int, default=8)
+    parser.add_argument('--horizon', type=int, default=30)
+    parser.add_argument('--step', type=int, default=30)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='processos do pool (padrão: todos os núcleos)')
+    parser.add_argument('--series', nargs='+',
+                        help='unique_ids a avaliar (padrão: todas as séries de series.json)')
+    args = parser.parse_args(argv)
+
+    inicio = min(GRID['start_train'])
+
+    # uma série por vez: cada backtest já ocupa todos os núcleos
+    for serie in read_series():
+
+        unique_id = serie['unique_id']
+
+        if args.series and unique_id not in args.series:
+            continue
+
+        # dados da versão publicada
+        refined_dir = os.path.join(artifacts.current_path(series_path(unique_id)), REFINED_DATA)
+
+        df = storage.read_refined(refined_dir, columns=['ds', 'y'], start=inicio)
+
+        results = run_backtest(df, unique_id, folds=args.folds, horizon=args.horizon,
+                               step=args.step, workers=args.workers)
+
+        save_data(df=results, filepath=series_path(unique_id, BACKTEST_DIR, RESULTS_FILE))
+
+        print(results.head(10).to_string())
+
+        scores = baseline_scores(df, folds=args.folds, horizon=args.horizon,
+                                 step=args.step, start_train=inicio)
+
+        save_data(df=scores, filepath=series_path(unique_id, BACKTEST_DIR, BASELINE_RESULTS_FILE))
+
+        print(f"Referência (baseline.py):\n{scores.to_string()}")
+
+        print(f"[{unique_id}] Melhor configuração: {save_best_params(results, unique_id)}")
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,131 @@
+# coding: utf-8
+
+# Modelos estatísticos simples calculados em lote com NumPy sobre uma matriz
+# (séries x tempo): naive, naive sazonal, drift e suavização exponencial simples.
+# Servem de referência para o Prophet, de alternativa quando o ajuste do Prophet
+# falha e de opção barata quando há muitas séries. As previsões saem no mesmo
+# formato da grade do Prophet (ds, yhat, yhat_lower, yhat_upper) mais unique_id e model.
+#
+# Séries com históricos de tamanhos diferentes ficam alinhadas pelo calendário, com
+# NaN antes do início de cada uma; as contas ignoram os NaN.
+
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# candidatos de alpha da suavização exponencial, avaliados em lote para todas as séries
+SES_ALPHAS = np.linspace(0.05, 1.0, 20)
+
+
+def to_matrix(df):
+    # formato longo (unique_id, ds, y) -> ids, datas e matriz (séries x tempo)
+    tabela = df.pivot(index='unique_id', columns='ds', values='y')
+
+    return tabela.index.to_numpy(), tabela.columns, tabela.to_numpy(dtype=np.float64)
+
+
+def last_valid(Y):
+
+    return pd.DataFrame(Y).ffill(axis=1).to_numpy()[:, -1]
+
+
+def first_valid(Y):
+
+    return pd.DataFrame(Y).bfill(axis=1).to_numpy()[:, 0]
+
+
+def naive(Y, h, season=7):
+    # repete o último valor; resíduos = diferença de um passo
+    sigma = np.nanstd(np.diff(Y, axis=1), axis=1)
+    passos = np.arange(1, h + 1)
+
+    yhat = np.repeat(last_valid(Y)[:, None], h, axis=1)
+
+    return yhat, sigma[:, None] * np.sqrt(passos)
+
+
+def seasonal_naive(Y, h, season=7):
+    # repete o último ciclo (semana, por padrão, já que a série diária repete o preço no fim de semana)
+    sigma = np.nanstd(Y[:, season:] - Y[:, :-season], axis=1)
+    passos = np.arange(1, h + 1)
+
+    yhat = Y[:, -season:][:, (passos - 1) % season]
+
+    return yhat, sigma[:, None] * np.sqrt((passos - 1) // season + 1)
+
+
+def drift(Y, h, season=7):
+    # reta entre a primeira e a última observação de cada série
+    n = np.sum(~np.isnan(Y), axis=1)
+    ultimo = last_valid(Y)
+    inclinacao = (ultimo - first_valid(Y)) / np.maximum(n - 1, 1)
+
+    residuos = np.diff(Y, axis=1) - inclinacao[:, None]
+    sigma = np.nanstd(residuos, axis=1)
+    passos = np.arange(1, h + 1)
+
+    yhat = ultimo[:, None] + inclinacao[:, None] * passos
+
+    return yhat, sigma[:, None] * np.sqrt(passos * (1 + passos / n[:, None]))
+
+
+def ses(Y, h, season=7, alphas=SES_ALPHAS):
+    # suavização exponencial simples com o alpha de menor erro de um passo em cada série.
+    # O laço percorre o tempo; séries e alphas candidatos são atualizados juntos
+    # numa matriz (séries x alphas)
+    nivel = np.repeat(first_valid(Y)[:, None], len(alphas), axis=1)
+    sse = np.zeros_like(nivel)
+
+    for t in range(1, Y.shape[1]):
+        y_t = Y[:, t][:, None]
+        erro = np.where(np.isnan(y_t), 0.0, y_t - nivel)
+        sse += erro ** 2
+        nivel += alphas * erro
+
+    melhor = sse.argmin(axis=1)
+    linhas = np.arange(Y.shape[0])
+
+    n = np.sum(~np.isnan(Y), axis=1)
+    sigma = np.sqrt(sse[linhas, melhor] / np.maximum(n - 1, 1))
+    alpha = alphas[melhor]
+    passos = np.arange(1, h + 1)
+
+    yhat = np.repeat(nivel[linhas, melhor][:, None], h, axis=1)
+
+    return yhat, sigma[:, None] * np.sqrt(1 + alpha[:, None] ** 2 * (passos - 1))
+
+
+MODELS = {'naive': naive, 'seasonal_naive': seasonal_naive, 'drift': drift, 'ses': ses}
+
+
+def forecast_matrix(Y, h, model, interval_width=0.95, season=7):
+    # previsão e limites (séries x h) de um modelo
+    yhat, erro_padrao = MODELS[model](Y, h, season=season)
+
+    z = NormalDist().inv_cdf(0.5 + interval_width / 2)
+
+    return yhat, yhat - z * erro_padrao, yhat + z * erro_padrao
+
+
+def forecast(df, h, models=MODELS, interval_width=0.95, season=7):
+    # df no formato longo do refined; devolve as previsões de todos os modelos
+    ids, datas, Y = to_matrix(df)
+
+    futuro = pd.date_range(datas[-1] + pd.Timedelta(days=1), periods=h, freq='D')
+
+    resultados = []
+
+    for model in models:
+        yhat, lower, upper = forecast_matrix(Y, h, model, interval_width, season)
+
+        resultados.append(pd.DataFrame({
+            'unique_id': np.repeat(ids, h),
+            'ds': np.tile(futuro, len(ids)),
+            'yhat': yhat.ravel(),
+            'yhat_lower': lower.ravel(),
+            'yhat_upper': upper.ravel(),
+            'model': model,
+        }))
+
+    return pd.concat(resultados, ignore_index=True)
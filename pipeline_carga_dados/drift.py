@@ -0,0 +1,115 @@
+# coding: utf-8
+
+# Agregados incrementais usados para decidir se o modelo de uma série precisa ser
+# retreinado ou se o publicado continua valendo.
+#
+# O estado descreve o modelo em uso (versão em que foi treinado, último dia do treino,
+# parâmetros e volatilidade da janela de treino) e guarda apenas somas e contagens,
+# atualizadas a cada carga só com os dias novos, sem reler o histórico:
+#
+# - erro: dias já comparados com a previsão publicada pelo modelo, soma do erro
+#   percentual absoluto (o wmape() do pipeline de cada lote vezes os dias do lote) e
+#   dias fora do intervalo de previsão;
+# - dados: contagem, média e soma dos quadrados dos desvios das variações diárias do
+#   preço desde o fim do treino (Welford, com cada lote combinado pela fórmula de Chan),
+#   comparadas com a volatilidade da janela de treino.
+#
+# decide() devolve o motivo para retreinar, ou None para manter o modelo, e as
+# métricas usadas na decisão. O módulo não depende do pipeline.
+
+import numpy as np
+import pandas as pd
+
+# Dias da janela de treino usados como referência de volatilidade
+VOLATILITY_WINDOW = 365
+
+
+def returns(y):
+    # Variações diárias relativas do preço (os preços do WTI já foram negativos, então
+    # a variação é relativa ao valor absoluto do dia anterior)
+    y = np.asarray(y, dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = np.diff(y) / np.abs(y[:-1])
+
+    return r[np.isfinite(r)]
+
+
+def new_state(model, last_day, params, y_train, fit_seconds):
+    # Estado de um modelo recém-treinado: nenhum dia comparado ainda
+    r = returns(np.asarray(y_train)[-VOLATILITY_WINDOW - 1:])
+
+    return {'model': model, 'trained_last_day': str(last_day), 'params': params,
+            'fit_seconds': fit_seconds,
+            'train_volatility': float(r.std(ddof=1)) if len(r) > 1 else None,
+            'scored_through': str(last_day), 'last_y': float(np.asarray(y_train)[-1]),
+            'error': {'days': 0, 'ape_sum': 0.0, 'outside': 0},
+            'returns': {'n': 0, 'mean': 0.0, 'm2': 0.0}}
+
+
+def update_error(state, days, wmape, outside):
+    # Um lote de `days` dias comparados, com erro percentual absoluto médio `wmape`
+    erro = state['error']
+
+    erro['days'] += int(days)
+    erro['ape_sum'] += float(wmape) * days
+    erro['outside'] += int(outside)
+
+
+def update_returns(state, r):
+    # Combina média e soma dos quadrados dos desvios do lote com as acumuladas
+    if len(r) == 0:
+        return
+
+    acumulado = state['returns']
+
+    n_a, media_a, m2_a = acumulado['n'], acumulado['mean'], acumulado['m2']
+    n_b, media_b = len(r), float(np.mean(r))
+    m2_b = float(np.sum((r - media_b) ** 2))
+
+    n = n_a + n_b
+    delta = media_b - media_a
+
+    acumulado.update(n=n, mean=media_a + delta * n_b / n, m2=m2_a + m2_b + delta ** 2 * n_a * n_b / n)
+
+
+def metrics(state, last_day):
+    # Erro acumulado, cobertura do intervalo, razão de volatilidade e idade do modelo (dias de dados)
+    erro, acumulado = state['error'], state['returns']
+
+    wmape = erro['ape_sum'] / erro['days'] if erro['days'] else None
+    outside = erro['outside'] / erro['days'] if erro['days'] else None
+
+    volatilidade = np.sqrt(acumulado['m2'] / (acumulado['n'] - 1)) if acumulado['n'] > 1 else None
+
+    razao = None
+    if volatilidade is not None and state['train_volatility']:
+        razao = float(volatilidade / state['train_volatility'])
+
+    return {'days': erro['days'], 'wmape': wmape, 'outside': outside, 'volatility_ratio': razao,
+            'age_days': (pd.Timestamp(last_day) - pd.Timestamp(state['trained_last_day'])).days}
+
+
+def decide(state, last_day, params, max_age, wmape_limit, volatility_limit, min_days):
+    # (motivo para retreinar ou None, métricas). Erro e volatilidade só contam depois de
+    # `min_days` dias comparados; a volatilidade vale nos dois sentidos (razão ou inverso)
+    if state is None:
+        return 'no_state', {}
+
+    atual = metrics(state, last_day)
+
+    if params != state['params']:
+        return 'params_changed', atual
+
+    if atual['age_days'] >= max_age:
+        return 'max_age', atual
+
+    if atual['days'] >= min_days and atual['wmape'] >= wmape_limit:
+        return 'error', atual
+
+    razao = atual['volatility_ratio']
+
+    if state['returns']['n'] >= min_days and razao and max(razao, 1 / razao) >= volatility_limit:
+        return 'data_drift', atual
+
+    return None, atual
@@ -0,0 +1,171 @@
+# coding: utf-8
+
+# Extrator dedicado da tabela de preços do IPEA.
+# A página é lida em blocos e alimentada num parser incremental do lxml, só as
+# linhas da tabela de preços são interpretadas e o restante do documento é descartado
+# à medida que é lido. Como o IPEA publica a série da data mais recente para a mais
+# antiga, a leitura é interrompida assim que passa da marca d'água.
+#
+# conditional_open() faz o GET condicional (ETag / Last-Modified da leitura anterior),
+# para o pipeline não baixar nem processar uma página que não mudou.
+
+import gzip
+import hashlib
+import re
+import threading
+import time
+from array import array
+from urllib.error import HTTPError
+from urllib.parse import urlparse
+from urllib.request import Request, urlopen
+
+import numpy as np
+from lxml import etree
+
+CHUNK_SIZE = 64 * 1024
+
+DATE_PATTERN = re.compile(r'^(\d{2})/(\d{2})/(\d{4})$')
+
+
+def open_source(source):
+    # aceita URL http(s), arquivo html ou html.gz (fixture salva), ou uma resposta já aberta
+    if hasattr(source, 'read'):
+        return source
+
+    if source.startswith(('http://', 'https://')):
+        return urlopen(source)
+
+    if source.endswith('.gz'):
+        return gzip.open(source, 'rb')
+
+    return open(source, 'rb')
+
+
+def conditional_open(source, etag=None, last_modified=None):
+    # GET com If-None-Match / If-Modified-Since. Retorna (resposta, validadores da
+    # resposta) ou (None, validadores enviados) se o servidor responder 304. Arquivos
+    # locais não têm validadores
+    if not source.startswith(('http://', 'https://')):
+        return open_source(source), {'etag': None, 'last_modified': None}
+
+    cabecalhos = {}
+
+    if etag:
+        cabecalhos['If-None-Match'] = etag
+
+    if last_modified:
+        cabecalhos['If-Modified-Since'] = last_modified
+
+    try:
+
+        resposta = urlopen(Request(source, headers=cabecalhos))
+
+    except HTTPError as err:
+
+        if err.code == 304:
+            return None, {'etag': etag, 'last_modified': last_modified}
+
+        raise
+
+    return resposta, {'etag': resposta.headers.get('ETag'), 'last_modified': resposta.headers.get('Last-Modified')}
+
+
+def table_hash(datas, precos):
+    # Hash do conteúdo da tabela lida (datas e preços), independente do HTML em volta
+    h = hashlib.sha256(np.asarray(datas, dtype='datetime64[D]').tobytes())
+    h.update(np.asarray(precos, dtype=np.float64).tobytes())
+
+    return h.hexdigest()
+
+
+class HostRateLimiter:
+    # Intervalo mínimo entre requisições ao mesmo host, compartilhado pelas threads
+    # de download. Cada chamada reserva o próximo horário livre do host e dorme fora
+    # do lock, então hosts diferentes não esperam uns pelos outros
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._proximo = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+
+        with self._lock:
+            agora = time.monotonic()
+            horario = max(agora, self._proximo.get(host, agora))
+            self._proximo[host] = horario + self.min_interval
+
+        if horario > agora:
+            time.sleep(horario - agora)
+
+
+def parse_price(texto):
+    # preço no formato brasileiro: milhar com '.', decimal com ','. Célula vazia vira NaN,
+    # como no read_html, e o transform preenche com o dia anterior
+    texto = (texto or '').strip()
+
+    if not texto:
+        return np.nan
+
+    return float(texto.replace('.', '').replace(',', '.'))
+
+
+def extract_prices(source, watermark=None, chunk_size=CHUNK_SIZE):
+    # Retorna (datas, preços) como arrays NumPy (datetime64[D] e float64), na ordem
+    # da página. Com watermark, para de ler na primeira data <= watermark.
+    limite = None if watermark is None else str(np.datetime64(watermark, 'D'))
+
+    parser = etree.HTMLPullParser(events=('end',), tag=('tr', 'table'))
+
+    datas = []
+    precos = array('d')
+
+    na_tabela = False
+    fim = False
+
+    with open_source(source) as resposta:
+
+        while not fim:
+
+            bloco = resposta.read(chunk_size)
+
+            if not bloco:
+                break
+
+            parser.feed(bloco)
+
+            for _, elem in parser.read_events():
+
+                if elem.tag == 'table':
+                    # a tabela de preços terminou: o resto da página não interessa
+                    fim = na_tabela
+
+                elif not na_tabela:
+                    # procura o cabeçalho da tabela de preços ('Data' na primeira coluna)
+                    celulas = elem.findall('td')
+                    na_tabela = len(celulas) == 2 and (celulas[0].text or '').strip() == 'Data'
+
+                else:
+                    celulas = elem.findall('td')
+                    dia = DATE_PATTERN.match((celulas[0].text or '').strip()) if len(celulas) == 2 else None
+
+                    if dia is not None:
+                        iso = f'{dia.group(3)}-{dia.group(2)}-{dia.group(1)}'
+
+                        if limite is not None and iso <= limite:
+                            fim = True
+                            break
+
+                        datas.append(iso)
+                        precos.append(parse_price(celulas[1].text))
+
+                # libera as linhas já processadas para manter a memória constante
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+
+                if fim:
+                    break
+
+    return np.array(datas, dtype='datetime64[D]'), np.frombuffer(precos, dtype=np.float64)
@@ -0,0 +1,240 @@
+# coding: utf-8
+
+# Formato binário do modelo Prophet ajustado (serialized_model.bin), no lugar do
+# model_to_json/model_from_json. O JSON guarda o histórico e os parâmetros como texto,
+# que precisa ser interpretado e convertido em DataFrames a cada carga; aqui o arquivo
+# é mapeado na memória e os dados são usados como estão no disco:
+#
+#   MAGIC (8 bytes) | tamanho do cabeçalho (uint32 little-endian) | cabeçalho JSON |
+#   blocos de dados, cada um alinhado em ALIGNMENT bytes
+#
+# - cabeçalho: versão do formato e do Prophet, atributos simples do modelo (os mesmos
+#   do prophet.serialize), sazonalidades, regressores, fit_kwargs e a posição
+#   (relativa ao início dos blocos), o dtype e o formato de cada bloco;
+# - arrays numpy (changepoints_t e os parâmetros ajustados: k, m, delta, beta,
+#   sigma_obs, trend...) gravados crus em little-endian, lidos com np.frombuffer sem
+#   cópia (somente leitura);
+# - DataFrames e Series (history, history_dates, changepoints, train_component_cols,
+#   holidays) em arquivos Arrow IPC sem compressão, também lidos do mapeamento.
+#
+# O arquivo é sempre gravado num temporário e substituído (artifacts.atomic_path), então
+# um modelo mapeado por um processo nunca muda embaixo dele. Versões publicadas antes
+# do formato continuam com o serialized_model.json, lido por load() com o
+# model_from_json. O módulo não importa o Prophet nem depende do pipeline, para poder
+# ser usado pelo app; o Prophet é importado só ao montar o modelo.
+
+import json
+import struct
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+MODEL_FILE = 'serialized_model.bin'
+JSON_MODEL_FILE = 'serialized_model.json'
+
+MAGIC = b'PRPHBIN\x00'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+PREFIX = struct.Struct('<8sI')
+
+INDEX_COLUMN = '__index__'
+
+# Atributos do modelo de tipos simples, copiados no cabeçalho (prophet.serialize.SIMPLE_ATTRIBUTES)
+SIMPLE_ATTRIBUTES = [
+    'growth', 'n_changepoints', 'specified_changepoints', 'changepoint_range',
+    'yearly_seasonality', 'weekly_seasonality', 'daily_seasonality',
+    'seasonality_mode', 'seasonality_prior_scale', 'changepoint_prior_scale',
+    'holidays_prior_scale', 'mcmc_samples', 'interval_width', 'uncertainty_samples',
+    'y_scale', 'y_min', 'scaling', 'logistic_floor', 'country_holidays', 'component_modes',
+    'holidays_mode'
+]
+
+PD_SERIES = ['changepoints', 'history_dates', 'train_holiday_names']
+
+PD_DATAFRAME = ['holidays', 'history', 'train_component_cols']
+
+ORDEREDDICT = ['seasonalities', 'extra_regressors']
+
+
+def padding(n):
+
+    return -n % ALIGNMENT
+
+
+def to_json(valor):
+    # Tipos numpy que aparecem nos atributos e no fit_kwargs (ex.: o init do warm start)
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+
+    if isinstance(valor, np.generic):
+        return valor.item()
+
+    raise TypeError(f'{type(valor).__name__} não serializável no cabeçalho do modelo')
+
+
+def arrow_bytes(df):
+    # DataFrame -> arquivo Arrow IPC. O índice vai como coluna (se não for o padrão
+    # 0..n-1) e os nomes do índice e das colunas ficam no cabeçalho: sem o metadado do
+    # pandas a volta para DataFrame não precisa reconstruí-lo, a parte mais lenta da leitura
+    padrao = df.index.equals(pd.RangeIndex(len(df)))
+
+    table = pa.Table.from_pandas(df.reset_index(drop=True) if padrao else df.reset_index(names=INDEX_COLUMN),
+                                 preserve_index=False).replace_schema_metadata()
+    sink = pa.BufferOutputStream()
+
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue().to_pybytes(), {'index_name': df.index.name, 'columns_name': df.columns.name}
+
+
+def write_model(model, filepath):
+    # Grava o modelo ajustado em filepath (use um caminho temporário, ver artifacts.atomic_path)
+    from prophet import __version__ as prophet_version
+
+    if model.history is None:
+        raise ValueError('só modelos já ajustados podem ser gravados')
+
+    blocos, posicao = [], 0
+
+    def bloco(dados):
+        nonlocal posicao
+
+        inicio = posicao
+        blocos.append(dados + b'\x00' * padding(len(dados)))
+        posicao += len(blocos[-1])
+
+        return {'offset': inicio, 'length': len(dados)}
+
+    arrays = {}
+
+    for nome, valor in [('changepoints_t', model.changepoints_t)] + [(f'params/{k}', v) for k, v in model.params.items()]:
+
+        valor = np.asarray(valor)
+        valor = np.ascontiguousarray(valor, dtype=valor.dtype.newbyteorder('<'))
+
+        arrays[nome] = {**bloco(valor.tobytes()), 'dtype': valor.dtype.str, 'shape': list(valor.shape)}
+
+    tables = {}
+
+    for nome in PD_SERIES + PD_DATAFRAME:
+
+        valor = getattr(model, nome)
+
+        if valor is None:
+            tables[nome] = None
+            continue
+
+        dados, nomes = arrow_bytes(valor.to_frame() if nome in PD_SERIES else valor)
+
+        tables[nome] = {**bloco(dados), **nomes, 'series': nome in PD_SERIES,
+                        'name': valor.name if nome in PD_SERIES else None}
+
+    header = {'format': FORMAT_VERSION, 'prophet_version': prophet_version,
+              'attributes': {nome: getattr(model, nome) for nome in SIMPLE_ATTRIBUTES},
+              'start': model.start.value, 't_scale': model.t_scale.value,
+              **{nome: [list(getattr(model, nome).keys()), getattr(model, nome)] for nome in ORDEREDDICT},
+              'fit_kwargs': model.fit_kwargs,
+              'arrays': arrays, 'tables': tables}
+
+    header = json.dumps(header, default=to_json).encode()
+
+    with open(filepath, 'wb') as file:
+
+        file.write(PREFIX.pack(MAGIC, len(header)))
+        file.write(header)
+        file.write(b'\x00' * padding(PREFIX.size + len(header)))
+
+        for dados in blocos:
+            file.write(dados)
+
+
+def read_header(buffer):
+    # (cabeçalho, posição do primeiro bloco) de um arquivo mapeado
+    magic, tamanho = PREFIX.unpack_from(buffer, 0)
+
+    if magic != MAGIC:
+        raise ValueError('arquivo não está no formato binário do modelo')
+
+    header = json.loads(buffer.slice(PREFIX.size, tamanho).to_pybytes())
+
+    if header['format'] > FORMAT_VERSION:
+        raise ValueError(f"formato do modelo {header['format']} mais novo que o suportado ({FORMAT_VERSION})")
+
+    return header, PREFIX.size + tamanho + padding(PREFIX.size + tamanho)
+
+
+def read_model(filepath):
+    # Modelo Prophet com os arrays apontando para o arquivo mapeado na memória
+    from prophet import Prophet
+
+    buffer = pa.memory_map(filepath, 'r').read_buffer()
+    header, dados = read_header(buffer)
+
+    def array(entrada):
+        return np.frombuffer(buffer, dtype=np.dtype(entrada['dtype']), count=int(np.prod(entrada['shape'])),
+                             offset=dados + entrada['offset']).reshape(entrada['shape'])
+
+    def table(entrada):
+        arrow = pa.ipc.open_file(buffer.slice(dados + entrada['offset'], entrada['length'])).read_all()
+
+        # colunas numéricas e de datas sem cópia, direto do mapeamento
+        df = pd.DataFrame({nome: coluna.to_numpy() for nome, coluna in zip(arrow.column_names, arrow.columns)},
+                          copy=False)
+
+        if INDEX_COLUMN in df.columns:
+            df = df.set_index(INDEX_COLUMN)
+
+        df.index.name = entrada['index_name']
+        df.columns.name = entrada['columns_name']
+
+        if not entrada['series']:
+            return df
+
+        return df.iloc[:, 0].rename(entrada['name'])
+
+    model = Prophet()  # os atributos do __init__ são todos substituídos abaixo
+
+    for nome, valor in header['attributes'].items():
+        setattr(model, nome, valor)
+
+    for nome, entrada in header['tables'].items():
+        setattr(model, nome, None if entrada is None else table(entrada))
+
+    model.start = pd.Timestamp(header['start'])
+    model.t_scale = pd.Timedelta(header['t_scale'])
+
+    for nome in ORDEREDDICT:
+        chaves, valores = header[nome]
+        setattr(model, nome, OrderedDict((chave, valores[chave]) for chave in chaves))
+
+    model.fit_kwargs = header['fit_kwargs']
+
+    model.changepoints_t = array(header['arrays']['changepoints_t'])
+    model.params = {nome.split('/', 1)[1]: array(entrada) for nome, entrada in header['arrays'].items()
+                    if nome.startswith('params/')}
+
+    model.stan_backend = None
+    model.stan_fit = None
+
+    return model
+
+
+def load(filepath):
+    # Modelo em qualquer dos dois formatos, pela extensão do arquivo
+    if filepath.endswith('.json'):
+        from prophet.serialize import model_from_json
+
+        with open(filepath, 'r') as fin:
+            return model_from_json(fin.read())
+
+    return read_model(filepath)
+
+
+def model_relpath(files):
+    # Arquivo do modelo numa versão publicada (entradas do manifesto ou nomes dos
+    # arquivos): o binário, ou o JSON das versões anteriores ao formato
+    return MODEL_FILE if MODEL_FILE in files else JSON_MODEL_FILE
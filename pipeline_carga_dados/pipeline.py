@@ -1,38 +1,150 @@
 #!/usr/bin/env python0
 # coding: utf-8
 
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 import pandas as pd
-from google.cloud import bigquery
-from google.oauth2 import service_account
 from prophet import Prophet
 import numpy as np
-from prophet.serialize import model_to_json
+
+import artifacts
+import baseline
+import drift
+import model_format
+import prediction
+import storage
+import tracing
+import warehouse
+from extrator import HostRateLimiter, conditional_open, extract_prices, table_hash
 
 import warnings
 warnings.filterwarnings('ignore')
 
+# Diretório compartilhado com o app (volume do docker-compose)
+SHARED_DIR = os.environ.get('SHARED_DIR', '/shared')
 
+# Cada série tem os seus artefatos em SHARED_DIR/series/<unique_id>/. Os dados,
+# o modelo e as previsões são publicados em versões (versions/<versão>, ver
+# artifacts.py); histórico dos ajustes, best_params.json e backtest ficam na raiz da série
+SERIES_DIR = os.path.join(SHARED_DIR, 'series')
 
-def extrac(url):
+RAW_DATA = 'raw_data'
+REFINED_DATA = 'refined_data'
+LAST_DAY = 'lastday.txt'
+MODEL = model_format.MODEL_FILE
+FORECAST_GRID = 'forecast_grid.parquet'
+ROLLUPS = 'rollups'
+BASELINE_FORECAST = 'baseline_forecast.parquet'
+FIT_REPORT = 'fit_report.jsonl'
+BEST_PARAMS = 'best_params.json'
+SOURCE_STATE = 'source.json'
+DRIFT_STATE = 'drift.json'
+FORECAST_LEDGER = 'forecast_ledger.parquet'
+WAREHOUSE_STATE = 'warehouse.json'
 
-    df = pd.read_html(url, decimal=',', thousands='.')[2]
+# Séries acompanhadas (unique_id e serid do IPEA)
+SERIES_FILE = os.environ.get('SERIES_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'series.json'))
 
-    df.columns = df.iloc[0]
-    
-    df = df[1:]
+# Endereço da página de cada série; pode apontar para um servidor local com páginas salvas
+IPEA_URL = os.environ.get('IPEA_URL', 'http://www.ipeadata.gov.br/ExibeSerie.aspx?module=m&serid={serid}&oper=view')
 
-    df.rename(columns={'PreÃ§o - petrÃ³leo bruto - Brent (FOB)': 'preco_petroleo_bruto'}, inplace=True)
-    
-    df['preco_petroleo_bruto'] = df['preco_petroleo_bruto'].astype(float)
+# Sincronização com o data warehouse (warehouse.py): 'bigquery', 'local' ou vazio para desligar
+WAREHOUSE_SINK = os.environ.get('WAREHOUSE_SINK', '')
+WAREHOUSE_DIR = os.path.join(SHARED_DIR, 'warehouse')
+
+# Downloads simultâneos e intervalo mínimo (s) entre requisições ao mesmo host
+FETCH_WORKERS = int(os.environ.get('FETCH_WORKERS', 4))
+FETCH_INTERVAL = float(os.environ.get('FETCH_INTERVAL', 1.0))
+
+# Configuração usada quando ainda não existe resultado do backtest (backtest.py)
+DEFAULT_PARAMS = {'start_train': '2018-01-01'}
+
+# Agregados publicados para o dashboard (semana ISO começando na segunda-feira)
+ROLLUP_FREQS = {'year': 'Y', 'month': 'M', 'week': 'W-SUN'}
+
+# Quantidade de dias futuros pré-calculados na grade de previsão
+FORECAST_HORIZON = int(os.environ.get('FORECAST_HORIZON', 365))
+
+# Probabilidade coberta pelos intervalos de previsão (Prophet, baseline e calibração
+# do modo analytic de prediction.py)
+INTERVAL_WIDTH = float(os.environ.get('INTERVAL_WIDTH', 0.95))
+
+# Dias mínimos simulados para calibrar o intervalo do modo analytic
+CALIBRATION_HORIZON = 365
+
+# Modelo de baseline.py publicado na grade de previsão quando o ajuste do Prophet falha
+FALLBACK_MODEL = 'ses'
+
+# Retreino só quando necessário (drift.py): erro percentual médio das previsões do
+# modelo publicado, razão entre a volatilidade dos dias novos e a do treino (em qualquer
+# sentido) e idade máxima do modelo em dias de dados. Erro e volatilidade só contam
+# depois de DRIFT_MIN_DAYS dias comparados
+RETRAIN_WMAPE = float(os.environ.get('RETRAIN_WMAPE', 0.08))
+RETRAIN_VOLATILITY = float(os.environ.get('RETRAIN_VOLATILITY', 2.0))
+MAX_MODEL_AGE = int(os.environ.get('MAX_MODEL_AGE', 30))
+DRIFT_MIN_DAYS = int(os.environ.get('DRIFT_MIN_DAYS', 5))
+
+# Warm start do ajuste a partir do modelo anterior, desligado por padrão: com o modelo
+# anterior de DRIFT_MIN_DAYS a MAX_MODEL_AGE dias o ganho é pequeno e a previsão passa
+# a depender do modelo de partida (benchmarks/bench_warm_start.py). WARM_START=1 ou --warm
+WARM_START = os.environ.get('WARM_START', '') == '1'
+
+
+def series_path(unique_id, *partes):
+
+    return os.path.join(SERIES_DIR, unique_id, *partes)
+
+
+def read_series():
+
+    with open(SERIES_FILE, 'r') as file:
+
+        return json.load(file)
+
+
+def extrac(url, watermark=None, limiter=None, validators=None):
+    # Lê apenas a tabela de preços da página do IPEA (ver extrator.py); com watermark
+    # a leitura para nas datas já ingeridas.
+    # Com validators (etag e last_modified da leitura anterior) o GET é condicional:
+    # retorna None se a página não mudou; senão o dict recebe os validadores da
+    # resposta e o hash da tabela lida
+    if limiter is not None:
+        limiter.wait(url)
+
+    if validators is None:
+
+        datas, precos = extract_prices(url, watermark=watermark)
+
+    else:
+
+        resposta, novos = conditional_open(url, validators.get('etag'), validators.get('last_modified'))
+
+        if resposta is None:
+            return None
+
+        datas, precos = extract_prices(resposta, watermark=watermark)
+
+        validators.update(novos, table_hash=table_hash(datas, precos))
+
+    df = pd.DataFrame({'Data': datas.astype('datetime64[ns]'),
+                       'preco_petroleo_bruto': precos})
 
     return df
 
 def save_data(df, filepath):
-    # Salvar o DataFrame como arquivo Parquet
+    # Salvar o DataFrame como arquivo Parquet (num temporário que substitui o arquivo no fim)
     try:
-     
-        df.to_parquet(filepath, index=False)
+
+        with tracing.stage('save_data') as etapa, artifacts.atomic_path(filepath) as tmp:
+            df.to_parquet(tmp, index=False)
+
+            etapa['rows'] = len(df)
+            etapa['bytes'] = os.path.getsize(tmp)
     
     except Exception as err:
     
@@ -41,34 +153,53 @@ def save_data(df, filepath):
     
     return True
 
-def load_to_bigquery(arquivo_parquet):
-    # Autenticação para o BigQuery usando arquivo de credenciais
-    pk_json_input = './chave.json'
+def save_refined(df, filepath):
+    # Partição do refined no layout de storage.py (ordenada por ds, y em float32, estatísticas)
+    try:
+
+        with tracing.stage('save_data') as etapa, artifacts.atomic_path(filepath) as tmp:
+            storage.write_refined(df, tmp)
+
+            etapa['rows'] = len(df)
+            etapa['bytes'] = os.path.getsize(tmp)
+
+    except Exception as err:
+
+        print(str(err))
+        return False
+
+    return True
+
+def partition_path(dirpath, ano):
+
+    return os.path.join(dirpath, f'ano={ano}', 'part-0.parquet')
 
-    projeto_bigquery = 'pos-tech-403001'
-    dataset_bigquery = 'tech_challenge'
-    tabela_bigquery = 'raw_petr_brent'
+def append_partitions(df, dirpath, dates, read=pd.read_parquet, save=save_data):
+    # Grava o DataFrame particionado por ano (dirpath/ano=AAAA/part-0.parquet).
+    # Apenas as partições dos anos presentes em df são lidas e regravadas, assim o
+    # custo de cada carga depende dos dias novos e não do tamanho do histórico.
+    # read/save: leitor e gravador das partições (para o refined, os de storage.py)
+    for ano, novos in df.groupby(dates.dt.year.values):
 
-    # Autenticação para o BigQuery usando arquivo de credenciais
-    credentials = service_account.Credentials.from_service_account_file(pk_json_input)
-    client = bigquery.Client(credentials=credentials, project=projeto_bigquery)
+        filepath = partition_path(dirpath, ano)
 
-    table_id = f'{projeto_bigquery}.{dataset_bigquery}.{tabela_bigquery}'
+        if os.path.exists(filepath):
+            novos = pd.concat([read(filepath), novos], ignore_index=True)
 
-    job_config = bigquery.LoadJobConfig(
-        source_format=bigquery.SourceFormat.PARQUET,
-        write_disposition='WRITE_TRUNCATE'
-    )
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
 
-    with open(arquivo_parquet, "rb") as source_file:
-        job = client.load_table_from_file(source_file, table_id, job_config=job_config)
+        if not save(df=novos, filepath=filepath):
+            return False
 
-    job.result()
+    return True
 
-    print(f"Dados carregados para {table_id} no BigQuery.")
+def read_last_partition(dirpath):
+    # Lê somente a partição mais recente (maior ano) do dataset
+    anos = [int(nome.split('=')[1]) for nome in os.listdir(dirpath) if nome.startswith('ano=')]
 
+    return storage.read_refined(partition_path(dirpath, max(anos)))
 
-def transform(df):
+def transform(df, unique_id='petro'):
     # transformando a coluna com as datas para Datetime, e ordernando essa coluna
     df['Data'] = pd.to_datetime(df['Data'], format='%d/%m/%Y')
     
@@ -88,11 +219,61 @@ def transform(df):
 
     df_1.reset_index(inplace=True)
 
-    df_1['unique_id'] = 'petro'
+    df_1['unique_id'] = unique_id
 
     return df_1
 
 
+def transform_tail(df_new, last_refined, unique_id='petro'):
+    # Aplica o transform() apenas na janela de dias novos. A última linha já refinada
+    # entra como semente para que o asfreq/ffill preencha a lacuna até o primeiro dia novo
+    semente = pd.DataFrame({'Data': [last_refined['ds']],
+                            'preco_petroleo_bruto': [last_refined['y']]})
+
+    df_1 = transform(pd.concat([semente, df_new], ignore_index=True), unique_id=unique_id)
+
+    return df_1[df_1['ds'] > last_refined['ds']].reset_index(drop=True)
+
+
+def aggregate(df, freq):
+    # média, mínimo, máximo e último preço de cada período (ds = início do período)
+    periodo = df['ds'].dt.to_period(freq).dt.start_time.rename('ds')
+
+    return df.groupby(periodo)['y'].agg(['mean', 'min', 'max', 'last']).reset_index()
+
+
+def update_rollups(df_new, base):
+    # Recalcula só os períodos a partir do que contém o primeiro dia novo; os períodos
+    # anteriores são mantidos do arquivo já publicado
+    inicio = df_new['ds'].min()
+
+    os.makedirs(os.path.join(base, ROLLUPS), exist_ok=True)
+
+    for grain, freq in ROLLUP_FREQS.items():
+
+        filepath = os.path.join(base, ROLLUPS, f'{grain}.parquet')
+
+        inicio_periodo = inicio.to_period(freq).start_time
+
+        if os.path.exists(filepath):
+            rollup = pd.read_parquet(filepath)
+            rollup = rollup[rollup['ds'] < inicio_periodo]
+        else:
+            rollup = None
+
+        df_periodo = storage.read_refined(os.path.join(base, REFINED_DATA), columns=['ds', 'y'],
+                                          start=inicio_periodo)
+
+        novos = aggregate(df_periodo, freq)
+
+        rollup = pd.concat([rollup, novos], ignore_index=True)
+
+        # variação percentual da média em relação ao período anterior (0 no primeiro)
+        rollup['pct_change'] = (rollup['mean'].pct_change() * 100).fillna(0)
+
+        save_data(df=rollup, filepath=filepath)
+
+
 def train_split_data(dff, start_train):
 
     train =  dff.loc[(dff['ds'] >= start_train)]
@@ -101,53 +282,711 @@ def train_split_data(dff, start_train):
     
     return train, last_date
 
-def wmape(y_true,y_pred):
-    y_true = y_true.values
-    y_pred = y_pred.values
-    return np.mean(np.abs((y_true - y_pred) / y_true))
+def wmape(y_true, y_pred, axis=None):
+    # aceita Series ou arrays; com axis=1 calcula o erro de cada linha (ex.: uma por fold)
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    return np.mean(np.abs((y_true - y_pred) / y_true), axis=axis)
 
 def save_model(model, filepath):
+    # Formato binário mapeável (model_format.py); o JSON herdado de versões anteriores
+    # ao formato é removido da versão
+    with artifacts.atomic_path(filepath) as tmp:
+
+        model_format.write_model(model, tmp)  # Save model
+
+    legado = os.path.join(os.path.dirname(filepath), model_format.JSON_MODEL_FILE)
+
+    if os.path.exists(legado):
+        os.remove(legado)
+
+
+def load_model(filepath):
+
+    return model_format.load(filepath)
+
+
+def warm_start_init(previous, df_train):
+    # Parâmetros ajustados do modelo anterior (k, m, delta, beta, sigma_obs) usados como
+    # valores iniciais do Stan. Só vale se o treino começa na mesma data, ou seja, se o
+    # histórico apenas recebeu dias novos; caso contrário o ajuste é feito do zero
+    if previous is None or previous.history['ds'].min() != df_train['ds'].min():
+        return None
+
+    return {'k': float(previous.params['k'][0, 0]),
+            'm': float(previous.params['m'][0, 0]),
+            'sigma_obs': float(previous.params['sigma_obs'][0, 0]),
+            'delta': previous.params['delta'][0],
+            'beta': previous.params['beta'][0]}
+
+
+def stan_iterations(model):
+    # Número de iterações do otimizador, lido da saída do CmdStan
+    try:
+
+        with open(model.stan_backend.stan_fit.runset.stdout_files[0]) as saida:
+
+            linhas = [linha.split() for linha in saida]
+
+        return max(int(linha[0]) for linha in linhas if linha and linha[0].isdigit())
+
+    except Exception:
+
+        return None
+
+
+def read_best_params(unique_id):
+    # Configuração vencedora do backtest: data de início do treino + hiperparâmetros do Prophet
+    try:
+
+        with open(series_path(unique_id, BEST_PARAMS), 'r') as file:
+
+            return json.load(file)
+
+    except (FileNotFoundError, ValueError):
+
+        return dict(DEFAULT_PARAMS)
+
+
+def fit_model(df_train, previous=None, prophet_params=None):
+    # Treina o Prophet partindo do modelo anterior quando possível. Se o ajuste com
+    # warm start falhar ou divergir (parâmetros não finitos) refaz o ajuste do zero.
+    # Retorna o modelo e um relatório com o modo, o tempo e as iterações do ajuste
+    prophet_params = prophet_params or {}
+
+    init = warm_start_init(previous, df_train)
+
+    if init is not None:
+
+        model = Prophet(interval_width=INTERVAL_WIDTH, **prophet_params)
+
+        inicio = time.perf_counter()
 
-    with open(filepath, 'w') as fout:
+        try:
 
-        fout.write(model_to_json(model))  # Save model
+            model.fit(df_train, init=init)
+
+            if all(np.isfinite(valor).all() for valor in model.params.values()):
+
+                # com formatos diferentes o Prophet ignora o valor inicial daquele parâmetro
+                mesmo_formato = all(model.params[par].shape[1] == init[par].shape[0]
+                                    for par in ('delta', 'beta'))
+
+                return model, {'mode': 'warm' if mesmo_formato else 'cold (formato mudou)',
+                               'seconds': round(time.perf_counter() - inicio, 3),
+                               'iterations': stan_iterations(model)}
+
+            print("Ajuste com warm start divergiu, ajustando do zero")
+
+        except Exception as err:
+
+            print(f"Ajuste com warm start falhou ({err}), ajustando do zero")
+
+    model = Prophet(interval_width=INTERVAL_WIDTH, **prophet_params)
+
+    inicio = time.perf_counter()
+
+    model.fit(df_train)
 
+    return model, {'mode': 'cold', 'seconds': round(time.perf_counter() - inicio, 3),
+                   'iterations': stan_iterations(model)}
 
-def save_last_day(last_day):
+
+def save_fit_report(report, unique_id):
+    # Histórico dos ajustes (uma linha JSON por execução)
+    with open(series_path(unique_id, FIT_REPORT), 'a') as file:
+
+        file.write(json.dumps(report) + '\n')
+
+
+def build_forecast_grid(model, horizon):
+    # Previsão diária (yhat e intervalo, com a simulação completa) para os próximos
+    # `horizon` dias após o fim do treino, consultada pelo app no lugar de rodar o
+    # Prophet a cada clique
+    fut = model.make_future_dataframe(periods=horizon, include_history=False, freq='D')
+
+    forecast = prediction.predict(model, fut, mode='full')
+
+    return forecast.sort_values('ds')
+
+
+def save_calibration(calibration, base):
+    # Coeficientes do intervalo do modo analytic, publicados junto com o modelo
+    with artifacts.atomic_path(os.path.join(base, prediction.CALIBRATION_FILE)) as tmp, open(tmp, 'w') as file:
+
+        json.dump(calibration, file, indent=2)
+
+
+def save_last_day(last_day, base):
   
-  with open("/shared/lastday.txt", 'w') as file:
+  with artifacts.atomic_path(os.path.join(base, LAST_DAY)) as tmp, open(tmp, 'w') as file:
   
     file.write(str(last_day))
 
 
+def read_last_day(base):
+    # Marca d'água da carga incremental: última data gravada por save_last_day()
+    try:
 
-if __name__ == "__main__":
-    
-    url = "http://www.ipeadata.gov.br/ExibeSerie.aspx?module=m&serid=1650971490&oper=view"
+        with open(os.path.join(base, LAST_DAY), 'r') as file:
+
+            return pd.Timestamp(file.read().strip())
+
+    except (FileNotFoundError, ValueError):
+
+        return None
+
+
+def read_source_state(version_dir):
+    # Validadores HTTP e hash da tabela da leitura que gerou a versão publicada
+    if version_dir is None:
+        return {}
+
+    try:
+
+        with open(os.path.join(version_dir, SOURCE_STATE), 'r') as file:
+
+            return json.load(file)
+
+    except (FileNotFoundError, ValueError):
+
+        return {}
+
+
+def save_source_state(state, base):
+
+    with artifacts.atomic_path(os.path.join(base, SOURCE_STATE)) as tmp, open(tmp, 'w') as file:
+
+        json.dump(state, file, indent=2)
+
+
+def skip_reason(df, watermark, fonte, anterior):
+    # Motivo para não processar a série, ou None se há dados novos
+    if df is None:
+        return 'not_modified'
+
+    if watermark is not None and df.empty:
+        return 'no_new_rows'
+
+    if watermark is None and fonte['table_hash'] == anterior.get('table_hash'):
+        return 'same_table_hash'
+
+    return None
+
+
+def skip_series(unique_id, reason, watermark):
+    # Registra a execução ignorada no histórico de ajustes e nas métricas
+    with tracing.stage('skip', series=unique_id, reason=reason):
+        save_fit_report({'mode': 'skipped', 'reason': reason,
+                         'date': datetime.now().isoformat(timespec='seconds'),
+                         'last_day': str(watermark)}, unique_id)
+
+    print(f"[{unique_id}] Sem dados novos ({reason}), versão publicada mantida")
+
+
+def read_drift_state(base):
+    # Agregados de erro e volatilidade do modelo da versão (drift.py), ou None se a
+    # versão é anterior ao retreino por degradação
+    try:
+
+        with open(os.path.join(base, DRIFT_STATE), 'r') as file:
+
+            return json.load(file)
+
+    except (FileNotFoundError, ValueError):
+
+        return None
+
+
+def save_drift_state(state, base):
+
+    with artifacts.atomic_path(os.path.join(base, DRIFT_STATE)) as tmp, open(tmp, 'w') as file:
+
+        json.dump(state, file, indent=2)
+
+
+def append_ledger(unique_id, model, base):
+    # Livro de previsões da série: a grade de cada modelo publicado, identificado pela
+    # versão em que foi treinado, para comparar com os preços que ainda vão chegar
+    filepath = series_path(unique_id, FORECAST_LEDGER)
+
+    df_grid = pd.read_parquet(os.path.join(base, FORECAST_GRID), columns=['ds', 'yhat', 'yhat_lower', 'yhat_upper'])
+    df_grid.insert(0, 'model', model)
+
+    if os.path.exists(filepath):
+        df_grid = pd.concat([pd.read_parquet(filepath), df_grid], ignore_index=True)
+
+    save_data(df=df_grid, filepath=filepath)
+
+
+def read_ledger(unique_id, model):
+
+    filepath = series_path(unique_id, FORECAST_LEDGER)
+
+    if not os.path.exists(filepath):
+        return pd.DataFrame(columns=['ds', 'yhat', 'yhat_lower', 'yhat_upper'])
+
+    return pd.read_parquet(filepath, filters=[('model', '==', model)]).drop(columns='model')
+
+
+def score_new_days(state, df_refined, unique_id):
+    # Soma aos agregados os dias posteriores ao último já comparado: o erro contra o que o
+    # modelo em uso previu para eles (livro de previsões) e as variações diárias do preço
+    novos = df_refined[df_refined['ds'] > pd.Timestamp(state['scored_through'])]
+
+    if novos.empty:
+        return 0
 
-    df = extrac(url=url)
+    comparados = novos.merge(read_ledger(unique_id, state['model']), on='ds')
+    comparados = comparados[comparados['y'] != 0]
 
-    save_data(df=df, filepath='/shared/raw_data.parquet')
+    if not comparados.empty:
 
-    df_refined = transform(df)
+        fora = (comparados['y'] < comparados['yhat_lower']) | (comparados['y'] > comparados['yhat_upper'])
 
-    save_data(df=df_refined, filepath='/shared/refined_data.parquet')
+        drift.update_error(state, len(comparados), wmape(comparados['y'], comparados['yhat']), fora.sum())
 
-    df_train, last_day = train_split_data(dff=df_refined, start_train= "2018-01-01")
+    drift.update_returns(state, drift.returns(np.concatenate([[state['last_y']], novos['y'].to_numpy()])))
+
+    state['scored_through'] = str(novos['ds'].iloc[-1])
+    state['last_y'] = float(novos['y'].iloc[-1])
+
+    return len(novos)
+
+
+def rounded(metricas):
+
+    return {chave: round(valor, 4) if isinstance(valor, float) else valor for chave, valor in metricas.items()}
+
+
+def keep_model(unique_id, base, state, last_day, atual):
+    # Versão nova com os dados do dia e o modelo, a grade e a calibração da anterior
+    save_drift_state(state, base)
+
+    report = {'mode': 'kept', 'date': datetime.now().isoformat(timespec='seconds'),
+              'last_day': str(last_day), 'model_last_day': state['trained_last_day'],
+              'saved_seconds': state['fit_seconds'],
+              **rounded(atual)}
+
+    with tracing.stage('keep', series=unique_id):
+        save_fit_report(report, unique_id)
+
+    print(f"[{unique_id}] Modelo de {state['trained_last_day'][:10]} mantido: {report}")
+
+    return report
+
+
+def read_warehouse_state(unique_id):
+    # Versão publicada já sincronizada com cada destino do warehouse ('sink:tabela')
+    try:
+
+        with open(series_path(unique_id, WAREHOUSE_STATE), 'r') as file:
+
+            return json.load(file)
+
+    except (FileNotFoundError, ValueError):
+
+        return {}
+
+
+def save_warehouse_state(unique_id, destino, version):
+
+    estado = read_warehouse_state(unique_id)
+    estado[destino] = version
+
+    with artifacts.atomic_path(series_path(unique_id, WAREHOUSE_STATE)) as tmp, open(tmp, 'w') as file:
+        json.dump(estado, file, indent=2)
+
+
+def pending_sync(series, destino):
+    # {unique_id: versão publicada} das séries cuja versão atual ainda não foi
+    # sincronizada com o destino, publicada nesta execução ou não: uma sincronização
+    # que falhou é refeita na execução seguinte, mesmo sem dados novos
+    pendentes = {}
+
+    for serie in series:
+
+        unique_id = serie['unique_id']
+        version = artifacts.current_version(series_path(unique_id))
+
+        if version is not None and read_warehouse_state(unique_id).get(destino) != version:
+            pendentes[unique_id] = version
+
+    return pendentes
+
+
+def audit(unique_id):
+    # Resumo do fit_report.jsonl: execuções por modo, motivos de retreino e tempo de
+    # ajuste economizado pelas execuções que mantiveram o modelo
+    try:
+
+        with open(series_path(unique_id, FIT_REPORT), 'r') as file:
+
+            reports = [json.loads(linha) for linha in file if linha.strip()]
+
+    except FileNotFoundError:
+
+        reports = []
+
+    modos = pd.Series([r['mode'] for r in reports], dtype=object).value_counts().to_dict()
+    motivos = pd.Series([r['retrain_reason'] for r in reports if 'retrain_reason' in r],
+                        dtype=object).value_counts().to_dict()
+
+    return {'runs': len(reports), 'modes': modos, 'retrain_reasons': motivos,
+            'fit_seconds': round(sum(r.get('seconds') or 0 for r in reports if 'iterations' in r), 3),
+            'saved_seconds': round(sum(r.get('saved_seconds') or 0 for r in reports if r['mode'] == 'kept'), 3)}
+
+
+def load_full(df, unique_id, base):
+    # Carga completa: recria os datasets particionados a partir de todo o histórico
+    raw_dir, refined_dir = os.path.join(base, RAW_DATA), os.path.join(base, REFINED_DATA)
+
+    for dirpath in (raw_dir, refined_dir):
+        shutil.rmtree(dirpath, ignore_errors=True)
+
+    append_partitions(df=df, dirpath=raw_dir, dates=df['Data'])
+
+    with tracing.stage('transform', series=unique_id) as etapa:
+        df_refined = transform(df, unique_id=unique_id)
+        etapa['rows'] = len(df_refined)
+
+    append_partitions(df=df_refined, dirpath=refined_dir, dates=df_refined['ds'],
+                      read=storage.read_refined, save=save_refined)
+
+    return df_refined
+
+
+def load_incremental(df, watermark, unique_id, base):
+    # Carga incremental: grava só as linhas posteriores à marca d'água
+    refined_dir = os.path.join(base, REFINED_DATA)
+
+    df_new = df[df['Data'] > watermark]
+
+    if df_new.empty:
+        return df_new
+
+    append_partitions(df=df_new, dirpath=os.path.join(base, RAW_DATA), dates=df_new['Data'])
+
+    with tracing.stage('transform', series=unique_id) as etapa:
+        df_refined = transform_tail(df_new, read_last_partition(refined_dir).iloc[-1], unique_id=unique_id)
+        etapa['rows'] = len(df_refined)
+
+    append_partitions(df=df_refined, dirpath=refined_dir, dates=df_refined['ds'],
+                      read=storage.read_refined, save=save_refined)
+
+    return df_refined
+
+
+
+def ingest_series(serie, full=False, limiter=None, force=False):
+    # Download (com marca d'água), carga incremental e agregados de uma série, gravados
+    # numa versão nova (ainda não publicada) cuja pasta é devolvida.
+    # Sem dados novos a série é ignorada antes de criar a versão e a função devolve None:
+    # a página não mudou (HTTP 304 para os validadores da versão publicada), não há
+    # linhas depois da marca d'água ou, numa leitura completa, a tabela tem o mesmo hash
+    # da publicada. force ignora essas verificações.
+    # Executada em threads: o tempo é dominado pela espera da rede
+    unique_id = serie['unique_id']
+
+    publicada = artifacts.current_path(series_path(unique_id))
+
+    watermark = None
+    if not full and publicada is not None and os.path.isdir(os.path.join(publicada, REFINED_DATA)):
+        watermark = read_last_day(publicada)
+
+    anterior = {} if force else read_source_state(publicada)
+
+    fonte = {'etag': anterior.get('etag'), 'last_modified': anterior.get('last_modified')}
+
+    with tracing.stage('extrac', series=unique_id) as etapa:
+        df = extrac(url=IPEA_URL.format(serid=serie['serid']), watermark=watermark, limiter=limiter,
+                    validators=fonte)
+        etapa['rows'] = 0 if df is None else len(df)
+
+    motivo = None if force else skip_reason(df, watermark, fonte, anterior)
+
+    if motivo is not None:
+        skip_series(unique_id, motivo, watermark or read_last_day(publicada))
+        return None
+
+    base = artifacts.stage_version(series_path(unique_id))
+
+    try:
+
+        # o hash só descreve a tabela inteira numa leitura completa
+        save_source_state({**fonte, 'table_hash': fonte['table_hash'] if watermark is None else None,
+                           'fetched': datetime.now().isoformat(timespec='seconds')}, base)
+
+        if watermark is None:
+
+            df_new = load_full(df, unique_id, base)
+
+        else:
+
+            df_new = load_incremental(df, watermark, unique_id, base)
+
+        print(f"[{unique_id}] {len(df_new)} dias novos gravados")
+
+        if not df_new.empty:
+            update_rollups(df_new, base)
+
+    except Exception:
+
+        artifacts.discard(base)
+        raise
+
+    return base
+
+
+def train_series(unique_id, base, horizon=FORECAST_HORIZON, warm=False, retrain=False):
+    # Treino e publicação do modelo, da grade de previsão e das previsões de referência
+    # de uma série. Executada num pool de processos, um ajuste do Prophet por núcleo.
+    # Só retreina se drift.decide() der um motivo (ou com retrain); senão a versão é
+    # publicada com o modelo anterior
+    warnings.filterwarnings('ignore')
+
+    prophet_params = read_best_params(unique_id)
+
+    start_train = prophet_params.pop('start_train')
+
+    # para o treino basta ler as linhas a partir do início do treino
+    df_refined = storage.read_refined(os.path.join(base, REFINED_DATA), start=start_train)
+
+    df_train, last_day = train_split_data(dff=df_refined, start_train=start_train)
 
     # salva a ultima data do modelo para calcular os dias futuror no lado do stramlit
-    save_last_day(last_day=last_day)
-    
-    model = Prophet(interval_width=0.95)
+    save_last_day(last_day=last_day, base=base)
 
-    model.fit(df_train)
+    # agregados do modelo publicado atualizados com os dias novos, e a decisão de retreino
+    params = {'start_train': start_train, **prophet_params}
+
+    state = read_drift_state(base)
+
+    with tracing.stage('drift', series=unique_id) as etapa:
+        etapa['rows'] = 0 if state is None else score_new_days(state, df_refined, unique_id)
+        motivo, atual = drift.decide(state, last_day, params, MAX_MODEL_AGE, RETRAIN_WMAPE,
+                                     RETRAIN_VOLATILITY, DRIFT_MIN_DAYS)
+
+    if retrain:
+        motivo = 'forced'
+
+    if motivo is None:
+        return keep_model(unique_id, base, state, last_day, atual)
+
+    model_file = os.path.join(base, MODEL)
+    forecast_grid_file = os.path.join(base, FORECAST_GRID)
+
+    # modelo anterior: o binário ou, em versões anteriores ao formato, o JSON
+    previous_file = os.path.join(base, model_format.model_relpath(os.listdir(base)))
+
+    previous = None
+
+    if warm and os.path.exists(previous_file):
+
+        try:
+
+            previous = load_model(previous_file)
+
+        except Exception as err:
+
+            print(f"[{unique_id}] Modelo anterior ignorado: {err}")
+
+    # previsões de referência (naive, sazonal, drift, suavização exponencial), em menos de um segundo
+    with tracing.stage('baseline', series=unique_id) as etapa:
+        df_baseline = baseline.forecast(df_train, h=horizon, interval_width=INTERVAL_WIDTH)
+        etapa['rows'] = len(df_baseline)
+
+    save_data(df=df_baseline, filepath=os.path.join(base, BASELINE_FORECAST))
+
+    try:
+
+        with tracing.stage('fit', series=unique_id, reason=motivo) as etapa:
+            etapa['rows'] = len(df_train)
+            model, report = fit_model(df_train, previous=previous, prophet_params=prophet_params)
+
+    except Exception as err:
+
+        print(f"[{unique_id}] Falha no ajuste do Prophet ({err}), publicando a previsão do modelo {FALLBACK_MODEL}")
+
+        df_grid = df_baseline[df_baseline['model'] == FALLBACK_MODEL]
+
+        save_data(df=df_grid[['ds', 'yhat', 'yhat_lower', 'yhat_upper']], filepath=forecast_grid_file)
+
+        report = {'mode': 'fallback', 'model': FALLBACK_MODEL, 'error': str(err),
+                  'date': datetime.now().isoformat(timespec='seconds'), 'last_day': str(last_day)}
+
+        save_fit_report(report, unique_id)
+
+        # o modelo da versão continua o anterior, assim como os seus agregados
+        if state is not None:
+            save_drift_state(state, base)
+
+        return report
+
+    report.update({'date': datetime.now().isoformat(timespec='seconds'),
+                   'last_day': str(last_day), 'rows': len(df_train),
+                   'start_train': start_train, **prophet_params,
+                   'retrain_reason': motivo, 'previous': rounded(atual)})
+
+    save_fit_report(report, unique_id)
+
+    print(f"[{unique_id}] Modelo ajustado: {report}")
 
     try:
     
-        save_model(model=model, filepath='/shared/serialized_model.json')
+        with tracing.stage('save_model', series=unique_id) as etapa:
+            save_model(model=model, filepath=model_file)
+            etapa['bytes'] = os.path.getsize(model_file)
 
-        print("Modelo salvo com sucesso")
+        print(f"[{unique_id}] Modelo salvo com sucesso")
 
     except Exception as err:
          
-        print(str(err))
\ No newline at end of file
+        print(str(err))
+
+    with tracing.stage('predict', series=unique_id) as etapa:
+        df_grid = build_forecast_grid(model, horizon)
+        etapa['rows'] = len(df_grid)
+
+    if save_data(df=df_grid, filepath=forecast_grid_file):
+
+        print(f"[{unique_id}] Grade de previsão de {horizon} dias salva com sucesso")
+
+    # a própria grade calibra o intervalo do modo analytic do app e do serviço de
+    # previsão; com um horizonte curto a simulação é refeita com CALIBRATION_HORIZON dias
+    if horizon < CALIBRATION_HORIZON:
+        df_grid = build_forecast_grid(model, CALIBRATION_HORIZON)
+
+    save_calibration(prediction.calibrate(model, df_grid), base)
+
+    # agregados zerados para o modelo novo, identificado pela versão em que foi treinado
+    save_drift_state(drift.new_state(os.path.basename(os.path.normpath(base)), last_day, params,
+                                     df_train['y'], report['seconds']), base)
+
+    return report
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--full', action='store_true',
+                        help='ignora a marca d\'água e recarrega todo o histórico')
+    parser.add_argument('--cold', action='store_true',
+                        help='retreina do zero, mesmo com --warm ou WARM_START=1')
+    parser.add_argument('--warm', action='store_true', default=WARM_START,
+                        help='parte dos parâmetros do modelo anterior no ajuste (warm start)')
+    parser.add_argument('--horizon', type=int, default=FORECAST_HORIZON,
+                        help='dias futuros pré-calculados na grade de previsão')
+    parser.add_argument('--series', nargs='+',
+                        help='unique_ids a processar (padrão: todas as séries de series.json)')
+    parser.add_argument('--sink', choices=['bigquery', 'local'], default=WAREHOUSE_SINK or None,
+                        help='envia os dias novos de todas as séries publicadas ao data warehouse')
+    parser.add_argument('--force', action='store_true',
+                        help='processa e treina mesmo se a fonte não tiver dados novos')
+    parser.add_argument('--audit', action='store_true',
+                        help='mostra os retreinos e o tempo de ajuste economizado de cada série e termina')
+    args = parser.parse_args(argv)
+
+    series = [serie for serie in read_series() if not args.series or serie['unique_id'] in args.series]
+
+    if args.audit:
+
+        for serie in series:
+            print(f"[{serie['unique_id']}] {json.dumps(audit(serie['unique_id']), ensure_ascii=False)}")
+
+        return
+
+    # 1) downloads e cargas em paralelo, respeitando o intervalo mínimo por host
+    limiter = HostRateLimiter(FETCH_INTERVAL)
+
+    carregadas = {}
+
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+
+        futures = {serie['unique_id']: pool.submit(ingest_series, serie, args.full, limiter, args.force)
+                   for serie in series}
+
+        for unique_id, future in futures.items():
+
+            try:
+
+                base = future.result()
+
+            except Exception as err:
+
+                print(f"[{unique_id}] Falha na carga: {err}")
+
+                continue
+
+            if base is not None:
+                carregadas[unique_id] = base
+
+    if not carregadas:
+        print("Nenhuma série com dados novos")
+
+    # 2) um modelo por série, distribuídos entre os núcleos
+    with ProcessPoolExecutor(max_workers=min(len(carregadas), os.cpu_count()) or 1) as pool:
+
+        # --full, --cold e --force retreinam sem consultar os agregados de drift.py
+        retrain = args.full or args.cold or args.force
+
+        futures = {unique_id: pool.submit(tracing.call_collecting, train_series,
+                                          unique_id, base, args.horizon, args.warm and not args.cold, retrain)
+                   for unique_id, base in carregadas.items()}
+
+        for unique_id, future in futures.items():
+
+            base = carregadas[unique_id]
+
+            try:
+
+                report, etapas = future.result()
+                tracing.merge(etapas)
+
+            except Exception as err:
+
+                print(f"[{unique_id}] Falha no treino: {err}")
+
+                # a versão publicada continua sendo a anterior
+                artifacts.discard(base)
+
+                continue
+
+            # 3) publica a versão completa de uma vez (manifesto + CURRENT)
+            with tracing.stage('publish', series=unique_id):
+                manifest = artifacts.publish(series_path(unique_id), base,
+                                             unique_id=unique_id, watermark=report['last_day'])
+
+            print(f"[{unique_id}] Versão {manifest['version']} publicada ({manifest['hash'][:12]})")
+
+            # só modelos novos entram no livro de previsões
+            if report['mode'] not in ('kept', 'fallback'):
+                append_ledger(unique_id, manifest['version'], base)
+
+    # 4) dias novos das versões publicadas ainda não sincronizadas, num único job de carga.
+    # O marcador de cada série só avança depois do job; se ele falhar, fica para a próxima
+    if args.sink:
+
+        sink = warehouse.make_sink(args.sink, root=WAREHOUSE_DIR)
+        destino = f'{args.sink}:{warehouse.BQ_TABLE}'
+
+        pendentes = pending_sync(series, destino)
+        fontes = {unique_id: artifacts.version_path(series_path(unique_id), version, REFINED_DATA)
+                  for unique_id, version in pendentes.items()}
+
+        with tracing.stage('warehouse_sync', sink=args.sink) as etapa:
+            linhas = warehouse.sync(sink, warehouse.BQ_TABLE, fontes)
+            etapa['rows'] = linhas
+
+        for unique_id, version in pendentes.items():
+            save_warehouse_state(unique_id, destino, version)
+
+        print(f"{linhas} linhas de {len(pendentes)} séries enviadas para {warehouse.BQ_TABLE} ({args.sink})")
+
+    # métricas da execução para o node exporter (TRACE_DIR/pipeline.prom)
+    tracing.write_textfile('pipeline')
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,158 @@
+# coding: utf-8
+
+# Modos de previsão do Prophet. O yhat é determinístico; quase todo o custo do
+# model.predict() está nos intervalos (yhat_lower/yhat_upper), calculados como
+# percentis de `uncertainty_samples` (1000) simulações da tendência futura mais o ruído.
+#
+# - full: predict() do Prophet, com todas as simulações;
+# - sampled: o mesmo com `samples` simulações (intervalo mais ruidoso);
+# - none: só o yhat, sem simulação (intervalos NaN);
+# - analytic: yhat sem simulação e intervalo pela fórmula fechada
+#
+#     yhat ± sqrt(ruido + c * h**p)
+#
+#   onde h são os dias após o fim do treino, ruido = (z * sigma_obs * y_scale)**2 é a
+#   parte do ruído de observação (exata) e c, p descrevem a incerteza da tendência,
+#   ajustados (regressão em log) às larguras da simulação completa da grade de
+#   previsão publicada pelo pipeline (calibrate()). Lados superior e inferior têm
+#   coeficientes próprios.
+#
+# O módulo não depende do pipeline nem importa o Prophet, para poder ser usado pelo app.
+
+import copy
+import json
+import os
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+PREDICT_MODES = ('full', 'sampled', 'none', 'analytic')
+
+# Simulações do modo sampled
+PREDICT_SAMPLES = int(os.environ.get('PREDICT_SAMPLES', 100))
+
+CALIBRATION_FILE = 'interval_calibration.json'
+
+COLUMNS = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+
+def with_samples(model, samples):
+    # Cópia rasa com outro número de simulações: o modelo original pode estar sendo
+    # usado por outras threads (ModelCache) e não é alterado
+    model = copy.copy(model)
+    model.uncertainty_samples = samples
+
+    return model
+
+
+def horizon_days(ds, last_day):
+    # Dias após o fim do treino (0 dentro do histórico, onde a tendência não tem incerteza)
+    dias = (pd.to_datetime(pd.Series(ds)) - pd.Timestamp(last_day)).dt.days.to_numpy()
+
+    return np.clip(dias, 0, None).astype(np.float64)
+
+
+def noise_variance(model):
+    # Quadrado da meia largura do intervalo devida só ao ruído de observação
+    z = NormalDist().inv_cdf((1 + model.interval_width) / 2)
+
+    return float((z * np.mean(model.params['sigma_obs']) * model.y_scale) ** 2)
+
+
+def calibrate(model, forecast):
+    # Coeficientes do modo analytic a partir de uma previsão completa (mode='full')
+    # dos dias futuros
+    last_day = model.history['ds'].max()
+    h = horizon_days(forecast['ds'], last_day)
+    ruido = noise_variance(model)
+
+    calibration = {'last_day': str(last_day.date()), 'interval_width': model.interval_width,
+                   'samples': model.uncertainty_samples, 'horizon': int(h.max()), 'noise': ruido}
+
+    for lado, largura in (('upper', forecast['yhat_upper'] - forecast['yhat']),
+                          ('lower', forecast['yhat'] - forecast['yhat_lower'])):
+
+        # só os dias em que a tendência já pesa mais que o ruído de Monte Carlo
+        resto = largura.to_numpy() ** 2 - ruido
+        usados = (h > 0) & (resto > 0.25 * ruido)
+
+        if usados.sum() < 2:
+            calibration[lado] = {'c': 0.0, 'p': 1.0}
+            continue
+
+        p, log_c = np.polyfit(np.log(h[usados]), np.log(resto[usados]), 1)
+
+        calibration[lado] = {'c': float(np.exp(log_c)), 'p': float(p)}
+
+    return calibration
+
+
+def read_calibration(version_dir):
+
+    try:
+
+        with open(os.path.join(version_dir, CALIBRATION_FILE), 'r') as file:
+            return json.load(file)
+
+    except FileNotFoundError:
+
+        return None
+
+
+def analytic_intervals(forecast, calibration):
+
+    h = horizon_days(forecast['ds'], calibration['last_day'])
+
+    for lado, sinal in (('upper', 1), ('lower', -1)):
+
+        c, p = calibration[lado]['c'], calibration[lado]['p']
+
+        forecast[f'yhat_{lado}'] = forecast['yhat'] + sinal * np.sqrt(calibration['noise'] + c * h ** p)
+
+    return forecast
+
+
+def predict(model, df, mode='full', samples=PREDICT_SAMPLES, calibration=None):
+    # Previsão (ds, yhat, yhat_lower, yhat_upper) das datas de df no modo escolhido
+    if mode == 'full':
+        forecast = model.predict(df)
+
+    elif mode == 'sampled':
+        forecast = with_samples(model, samples).predict(df)
+
+    elif mode in ('none', 'analytic'):
+        forecast = with_samples(model, 0).predict(df)
+        forecast['yhat_lower'] = forecast['yhat_upper'] = np.nan
+
+        if mode == 'analytic':
+
+            if calibration is None:
+                raise ValueError('modo analytic sem calibração publicada')
+
+            analytic_intervals(forecast, calibration)
+
+    else:
+        raise ValueError(f'modo de previsão desconhecido: {mode}')
+
+    return forecast[COLUMNS]
+
+
+class Predictor:
+    # Modelo e calibração da mesma versão publicada, com o modo escolhido. Sem
+    # calibração o modo analytic passa a full
+
+    def __init__(self, model, calibration=None, mode='full', samples=PREDICT_SAMPLES):
+
+        if mode == 'analytic' and calibration is None:
+            print("Versão sem calibração dos intervalos, usando o modo full")
+            mode = 'full'
+
+        self.model = model
+        self.calibration = calibration
+        self.mode = mode
+        self.samples = samples
+
+    def predict(self, df):
+
+        return predict(self.model, df, self.mode, self.samples, self.calibration)
@@ -0,0 +1,117 @@
+# coding: utf-8
+
+# Layout dos arquivos Parquet do refined (unique_id, ds, y), pensado para leituras
+# por intervalo de datas:
+#
+# - linhas ordenadas por ds e grupos de linhas de REFINED_ROW_GROUP_ROWS linhas, com
+#   estatísticas (mínimo/máximo) por grupo: um filtro em ds descarta, sem ler, os
+#   grupos e as partições (ano=AAAA) fora do intervalo;
+# - unique_id com dicionário (o valor é o mesmo em todas as linhas do arquivo);
+# - y em float32 quando a conversão não perde nada: a leitura volta para float64
+#   arredondando para os 7 algarismos significativos que o float32 guarda, o que
+#   recupera exatamente preços como 143,95. Se algum valor não sobreviver à ida e
+#   volta, a partição é gravada em float64; a leitura converte cada partição
+#   separadamente, então partições dos dois tipos convivem no mesmo dataset.
+#
+# read_refined() é o leitor usado pelo pipeline, backtest, warehouse e app. O módulo
+# não depende do pipeline, para poder ser importado pelo app.
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as pds
+import pyarrow.parquet as pq
+
+REFINED_ROW_GROUP_ROWS = int(os.environ.get('REFINED_ROW_GROUP_ROWS', 4096))
+
+FLOAT32_DIGITS = 7
+
+REFINED_COLUMNS = ['ds', 'y', 'unique_id']
+
+
+def to_float64(y):
+    # float32 -> float64 arredondado a FLOAT32_DIGITS algarismos significativos
+    y = np.asarray(y, dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        casas = FLOAT32_DIGITS - 1 - np.floor(np.log10(np.abs(y)))
+
+    escala = 10.0 ** np.where(np.isfinite(casas), casas, 0)
+
+    return np.round(y * escala) / escala
+
+
+def fits_float32(y):
+
+    y = np.asarray(y, dtype=np.float64)
+
+    return np.array_equal(to_float64(y.astype(np.float32)), y, equal_nan=True)
+
+
+def refined_table(df):
+    # DataFrame (ds, y, unique_id) -> tabela Arrow no layout do refined
+    df = df.sort_values('ds', kind='stable')
+
+    y = df['y'].to_numpy(dtype=np.float64)
+
+    return pa.table({
+        'ds': pa.array(df['ds'].to_numpy(), type=pa.timestamp('ns')),
+        'y': pa.array(y.astype(np.float32) if fits_float32(y) else y),
+        'unique_id': pa.array(df['unique_id'].astype(str).to_numpy(), type=pa.string()).dictionary_encode(),
+    })
+
+
+def write_refined(df, filepath):
+
+    pq.write_table(refined_table(df), filepath, row_group_size=REFINED_ROW_GROUP_ROWS,
+                   use_dictionary=['unique_id'], write_statistics=True)
+
+
+def read_refined(path, columns=REFINED_COLUMNS, start=None, end=None):
+    # Lê um arquivo ou o dataset particionado, opcionalmente só as datas em
+    # [start, end). Os limites viram filtros do leitor: partições e grupos de linhas
+    # fora do intervalo não são lidos.
+    #
+    # Cada partição é lida com o seu próprio schema e o y vai para float64 antes de
+    # juntar as partições: lido de uma vez, o dataset usaria o schema do primeiro
+    # arquivo e uma partição em float64 depois de outra em float32 perderia precisão
+    filtro = None
+
+    if start is not None:
+        start = pd.Timestamp(start)
+        filtro = pds.field('ds') >= pa.scalar(start, type=pa.timestamp('ns'))
+
+    if end is not None:
+        end = pd.Timestamp(end)
+        limite = pds.field('ds') < pa.scalar(end, type=pa.timestamp('ns'))
+        filtro = limite if filtro is None else filtro & limite
+
+    dataset = pds.dataset(path, format='parquet', partitioning='hive')
+
+    particoes = None
+
+    if os.path.isdir(path) and 'ano' in dataset.schema.names:
+        if start is not None:
+            particoes = pds.field('ano') >= start.year
+        if end is not None:
+            limite = pds.field('ano') <= end.year
+            particoes = limite if particoes is None else particoes & limite
+
+    tabelas = [float64_y(fragmento.to_table(schema=fragmento.physical_schema, columns=columns, filter=filtro))
+               for fragmento in dataset.get_fragments(filter=particoes)]
+
+    if not tabelas:
+        tabelas = [float64_y(dataset.schema.empty_table().select(columns))]
+
+    return pa.concat_tables(tabelas).to_pandas()
+
+
+def float64_y(table):
+    # y de uma partição em float32 -> float64 arredondado (to_float64)
+    if 'y' not in table.column_names or table.schema.field('y').type != pa.float32():
+        return table
+
+    return table.set_column(table.column_names.index('y'), 'y',
+                            pa.array(to_float64(table.column('y').to_numpy()), type=pa.float64()))
@@ -0,0 +1,218 @@
+# coding: utf-8
+
+# Medição por etapa do pipeline e das seções do app.
+#
+#   with tracing.stage('transform', series='petro') as etapa:
+#       df = transform(df)
+#       etapa['rows'] = len(df)
+#
+# Cada etapa registra tempo de relógio, tempo de CPU do processo, variação da memória
+# residente do processo durante a etapa (RSS na saída menos RSS na entrada, lido de
+# /proc/self/statm; vazio onde não há /proc), linhas e bytes informados pelo código.
+# O ru_maxrss não serve aqui: é o pico da vida inteira do processo, e depois da etapa
+# mais pesada todas as seguintes mostrariam o mesmo valor.
+# Os registros vão, um por linha, para TRACE_DIR/runs.jsonl e são somados em memória
+# por (etapa, rótulos); write_textfile() grava esses totais em TRACE_DIR/<job>.prom
+# no formato de texto do Prometheus, lido pelo textfile collector do node exporter.
+#
+# Sem TRACE_DIR a medição fica desligada: stage() devolve sempre o mesmo objeto,
+# que não mede nada.
+#
+# Etapas executadas em pools de processos são devolvidas ao processo principal com
+# call_collecting() e merge(), para entrarem no mesmo arquivo .prom.
+#
+# O módulo não depende do pipeline, para poder ser importado pelo app.
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+TRACE_DIR = os.environ.get('TRACE_DIR', '')
+
+RUNS_FILE = 'runs.jsonl'
+
+# rótulos do .prom: (etapa, rótulos ordenados) -> totais
+_totais = {}
+_lock = threading.Lock()
+
+# registros guardados só durante call_collecting(), para serem devolvidos ao processo principal
+_registros = None
+
+# destino das atribuições (etapa['rows'] = ...) com a medição desligada
+_descarte = {}
+
+
+def enabled():
+
+    return bool(TRACE_DIR)
+
+
+def run_id():
+    # Identificador da execução, herdado pelos processos filhos pela variável de ambiente
+    if 'TRACE_RUN' not in os.environ:
+        os.environ['TRACE_RUN'] = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+
+    return os.environ['TRACE_RUN']
+
+
+def current_rss():
+    # RSS atual do processo em bytes (Linux); None sem /proc (Windows, macOS)
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            paginas = int(file.read().split()[1])
+
+    except (OSError, ValueError, IndexError):
+        return None
+
+    return paginas * os.sysconf('SC_PAGE_SIZE')
+
+
+class Stage:
+
+    def __init__(self, nome, labels):
+        self.nome = nome
+        self.labels = labels
+        self.valores = {}
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        self.cpu = time.process_time()
+        self.rss = current_rss()
+
+        return self.valores
+
+    def __exit__(self, tipo, erro, tb):
+        rss = current_rss()
+
+        registro = {'run': run_id(), 'stage': self.nome, **self.labels,
+                    'ts': datetime.now().isoformat(timespec='seconds'),
+                    'wall_s': round(time.perf_counter() - self.inicio, 6),
+                    'cpu_s': round(time.process_time() - self.cpu, 6),
+                    'rss_delta_bytes': None if rss is None or self.rss is None else rss - self.rss,
+                    'rows': self.valores.get('rows'),
+                    'bytes': self.valores.get('bytes'),
+                    'ok': tipo is None}
+
+        record(registro)
+
+        if _registros is not None:
+            _registros.append(registro)
+
+        with open(os.path.join(TRACE_DIR, RUNS_FILE), 'a') as file:
+            file.write(json.dumps(registro) + '\n')
+
+        return False
+
+
+class _Noop:
+
+    def __enter__(self):
+        return _descarte
+
+    def __exit__(self, tipo, erro, tb):
+        return False
+
+
+_NOOP = _Noop()
+
+
+def stage(nome, **labels):
+
+    if not TRACE_DIR:
+        return _NOOP
+
+    os.makedirs(TRACE_DIR, exist_ok=True)
+
+    return Stage(nome, labels)
+
+
+def record(registro):
+    # Soma o registro nos totais do processo
+    labels = tuple(sorted((k, str(v)) for k, v in registro.items()
+                          if k not in ('run', 'stage', 'ts', 'wall_s', 'cpu_s', 'rss_delta_bytes',
+                                       'rows', 'bytes', 'ok')))
+
+    with _lock:
+        total = _totais.setdefault((registro['stage'], labels), {
+            'runs': 0, 'errors': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+            'wall_seconds_last': 0.0, 'rss_delta_bytes_max': 0, 'rows': 0, 'bytes': 0})
+
+        total['runs'] += 1
+        total['errors'] += not registro['ok']
+        total['wall_seconds'] += registro['wall_s']
+        total['cpu_seconds'] += registro['cpu_s']
+        total['wall_seconds_last'] = registro['wall_s']
+        total['rss_delta_bytes_max'] = max(total['rss_delta_bytes_max'], registro['rss_delta_bytes'] or 0)
+        total['rows'] += registro['rows'] or 0
+        total['bytes'] += registro['bytes'] or 0
+
+
+def merge(registros):
+    # Soma nos totais deste processo as etapas medidas em outro (já gravadas no runs.jsonl)
+    for registro in registros:
+        record(registro)
+
+
+def call_collecting(fn, *args, **kwargs):
+    # Para submeter a um pool de processos: devolve (resultado, etapas medidas no filho)
+    global _registros
+    _registros = []
+
+    try:
+        resultado = fn(*args, **kwargs)
+
+    finally:
+        registros, _registros = _registros, None
+
+    return resultado, registros
+
+
+def label_value(valor):
+    # Valor de rótulo no formato de texto do Prometheus: \\, \" e \n escapados
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def write_textfile(job):
+    # Totais por etapa no formato de texto do Prometheus, gravados de uma vez (tmp + rename)
+    if not TRACE_DIR:
+        return
+
+    metricas = [('runs', 'counter', 'runs_total', 'Execuções da etapa'),
+                ('errors', 'counter', 'errors_total', 'Execuções da etapa que terminaram com exceção'),
+                ('wall_seconds', 'counter', 'wall_seconds_total', 'Tempo de relógio acumulado'),
+                ('cpu_seconds', 'counter', 'cpu_seconds_total', 'Tempo de CPU do processo acumulado'),
+                ('wall_seconds_last', 'gauge', 'wall_seconds_last', 'Tempo de relógio da última execução'),
+                ('rss_delta_bytes_max', 'gauge', 'rss_delta_bytes_max',
+                 'Maior aumento de memória residente do processo numa execução da etapa'),
+                ('rows', 'counter', 'rows_total', 'Linhas processadas'),
+                ('bytes', 'counter', 'bytes_total', 'Bytes gravados')]
+
+    with _lock:
+        totais = {chave: dict(total) for chave, total in _totais.items()}
+
+    linhas = []
+
+    for campo, tipo, sufixo, ajuda in metricas:
+
+        nome = f'{job}_stage_{sufixo}'
+        linhas += [f'# HELP {nome} {ajuda}', f'# TYPE {nome} {tipo}']
+
+        for (etapa, labels), total in sorted(totais.items()):
+            rotulos = ','.join(f'{k}="{label_value(v)}"' for k, v in (('stage', etapa),) + labels)
+            linhas.append(f'{nome}{{{rotulos}}} {total[campo]}')
+
+    linhas += [f'# HELP {job}_last_run_timestamp_seconds Fim da última execução',
+               f'# TYPE {job}_last_run_timestamp_seconds gauge',
+               f'{job}_last_run_timestamp_seconds {time.time():.0f}']
+
+    filepath = os.path.join(TRACE_DIR, f'{job}.prom')
+
+    # temporário por thread: várias sessões do app podem gravar ao mesmo tempo
+    tmp = f'{filepath}.tmp{os.getpid()}-{threading.get_ident()}'
+
+    with open(tmp, 'w') as file:
+        file.write('\n'.join(linhas) + '\n')
+
+    os.replace(tmp, filepath)
@@ -0,0 +1,210 @@
+# coding: utf-8
+
+# Sincronização incremental do refined com o data warehouse.
+#
+# Em vez de recarregar o histórico inteiro a cada dia, sync() consulta a maior data
+# de cada série já presente na tabela e envia só as linhas posteriores, de todas as
+# séries juntas, num único job de carga. A tabela do BigQuery é particionada por mês
+# em `ds` (particionar por dia passaria do limite de partições com 35 anos de dados)
+# e clusterizada por `unique_id`. Dois modos de escrita:
+#
+# - append: WRITE_APPEND direto na tabela (padrão, já que só vão linhas novas);
+# - merge: carga numa tabela de staging seguida de um MERGE por (unique_id, ds),
+#   que também corrige valores revisados pela fonte sem duplicar linhas.
+#
+# A tabela (BQ_TABLE, padrão tech_challenge.precos_diarios) guarda o refined de todas
+# as séries (unique_id, ds, y) e substitui a raw_petr_brent, que recebia o raw da série
+# do Brent (Data, preco_petroleo_bruto) com WRITE_TRUNCATE. Os esquemas são diferentes
+# e a raw_petr_brent não é mais atualizada: consultas sobre ela devem passar para a
+# tabela nova, filtrando unique_id = 'petro'.
+#
+# O destino é um "sink" com a interface ensure_table / max_dates / write:
+# BigQuerySink (um cliente por processo, reaproveitado entre as chamadas) e
+# LocalSink, que grava a tabela como Parquet particionado por ano num diretório
+# local, para rodar e conferir a sincronização sem credenciais. Os clientes do Google
+# Cloud são importados só pelo BigQuerySink, então o pipeline e o LocalSink não
+# dependem deles.
+
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+import storage
+
+BQ_PROJECT = os.environ.get('BQ_PROJECT', 'pos-tech-403001')
+BQ_TABLE = os.environ.get('BQ_TABLE', f'{BQ_PROJECT}.tech_challenge.precos_diarios')
+BQ_CREDENTIALS = os.environ.get('BQ_CREDENTIALS', './chave.json')
+
+# append ou merge
+WAREHOUSE_MODE = os.environ.get('WAREHOUSE_MODE', 'append')
+
+COLUMNS = ['unique_id', 'ds', 'y']
+
+
+def bigquery_schema():
+    from google.cloud import bigquery
+
+    return [
+        bigquery.SchemaField('unique_id', 'STRING', mode='REQUIRED'),
+        bigquery.SchemaField('ds', 'DATE', mode='REQUIRED'),
+        bigquery.SchemaField('y', 'FLOAT64'),
+    ]
+
+
+@lru_cache(maxsize=None)
+def bigquery_client(credentials_file=BQ_CREDENTIALS, project=BQ_PROJECT):
+    # Um cliente (e o seu pool de conexões HTTP) por processo
+    from google.cloud import bigquery
+    from google.oauth2 import service_account
+
+    credentials = service_account.Credentials.from_service_account_file(credentials_file)
+
+    return bigquery.Client(credentials=credentials, project=project)
+
+
+class BigQuerySink:
+
+    def __init__(self, client=None):
+        from google.cloud import bigquery
+
+        self.bigquery = bigquery
+        self.schema = bigquery_schema()
+        self.client = client or bigquery_client()
+        self.jobs = 0
+
+    def ensure_table(self, table_id):
+        table = self.bigquery.Table(table_id, schema=self.schema)
+        table.time_partitioning = self.bigquery.TimePartitioning(
+            type_=self.bigquery.TimePartitioningType.MONTH, field='ds')
+        table.clustering_fields = ['unique_id']
+
+        self.client.create_table(table, exists_ok=True)
+
+    def max_dates(self, table_id):
+        query = f'SELECT unique_id, MAX(ds) AS ds FROM `{table_id}` GROUP BY unique_id'
+
+        linhas = self.client.query(query).result()
+
+        return {linha['unique_id']: pd.Timestamp(linha['ds']) for linha in linhas}
+
+    def load(self, df, table_id, write_disposition):
+        job_config = self.bigquery.LoadJobConfig(schema=self.schema, write_disposition=write_disposition)
+
+        # a coluna DATE do BigQuery é carregada a partir de datetime.date
+        df = df.assign(ds=df['ds'].dt.date)
+
+        self.client.load_table_from_dataframe(df, table_id, job_config=job_config).result()
+        self.jobs += 1
+
+    def write(self, table_id, df, mode=WAREHOUSE_MODE):
+
+        if mode == 'append':
+            self.load(df, table_id, self.bigquery.WriteDisposition.WRITE_APPEND)
+            return
+
+        staging_id = f'{table_id}_staging'
+
+        self.load(df, staging_id, self.bigquery.WriteDisposition.WRITE_TRUNCATE)
+
+        # o filtro em t.ds limita o MERGE às partições que recebem linhas
+        merge = f"""
+            MERGE `{table_id}` t
+            USING `{staging_id}` s
+            ON t.unique_id = s.unique_id AND t.ds = s.ds
+               AND t.ds >= DATE '{df['ds'].min().date()}'
+            WHEN MATCHED THEN UPDATE SET y = s.y
+            WHEN NOT MATCHED THEN INSERT (unique_id, ds, y) VALUES (s.unique_id, s.ds, s.y)
+        """
+
+        self.client.query(merge).result()
+        self.jobs += 1
+
+
+class LocalSink:
+    # Mesma interface gravando em root/<tabela>/ano=AAAA/part-0.parquet
+
+    def __init__(self, root):
+        self.root = root
+        self.jobs = 0
+
+    def table_path(self, table_id):
+
+        return os.path.join(self.root, table_id)
+
+    def ensure_table(self, table_id):
+
+        os.makedirs(self.table_path(table_id), exist_ok=True)
+
+    def max_dates(self, table_id):
+        path = self.table_path(table_id)
+
+        if not os.listdir(path):
+            return {}
+
+        df = pd.read_parquet(path, columns=['unique_id', 'ds'])
+
+        return df.groupby('unique_id')['ds'].max().to_dict()
+
+    def write(self, table_id, df, mode=WAREHOUSE_MODE):
+
+        for ano, novos in df.groupby(df['ds'].dt.year.values):
+
+            filepath = os.path.join(self.table_path(table_id), f'ano={ano}', 'part-0.parquet')
+
+            if os.path.exists(filepath):
+                novos = pd.concat([pd.read_parquet(filepath), novos], ignore_index=True)
+
+            if mode == 'merge':
+                novos = novos.drop_duplicates(subset=['unique_id', 'ds'], keep='last')
+
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+            novos.sort_values(['unique_id', 'ds']).to_parquet(filepath, index=False)
+
+        self.jobs += 1
+
+
+def make_sink(nome, root=None):
+    # 'bigquery' ou 'local' (root: diretório da tabela local)
+    if nome == 'bigquery':
+        return BigQuerySink()
+
+    if nome == 'local':
+        return LocalSink(root)
+
+    raise ValueError(f'sink desconhecido: {nome}')
+
+
+def sync(sink, table_id, fontes, mode=WAREHOUSE_MODE):
+    # fontes: {unique_id: diretório do refined particionado por ano}. Lê de cada série
+    # só as linhas a partir da maior data já sincronizada e envia todas as
+    # linhas novas num único job. Retorna o número de linhas enviadas
+    if not fontes:
+        return 0
+
+    sink.ensure_table(table_id)
+
+    maximos = sink.max_dates(table_id)
+
+    novos = []
+
+    for unique_id, refined_dir in fontes.items():
+
+        maximo = maximos.get(unique_id)
+
+        df = storage.read_refined(refined_dir, columns=['ds', 'y'], start=maximo)
+
+        if maximo is not None:
+            df = df[df['ds'] > maximo]
+
+        novos.append(df.assign(unique_id=unique_id)[COLUMNS])
+
+    df_novos = pd.concat(novos, ignore_index=True)
+
+    if df_novos.empty:
+        return 0
+
+    sink.write(table_id, df_novos, mode=mode)
+
+    return len(df_novos)
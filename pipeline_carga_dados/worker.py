@@ -0,0 +1,355 @@
+# coding: utf-8
+
+# Processo residente do contêiner do ETL, no lugar do cron. Importa o pipeline e o
+# backtest uma única vez (pandas, Prophet, cmdstanpy) e faz um ajuste pequeno para
+# carregar o executável do Stan; cada execução é um processo filho criado com fork a
+# partir desse processo já aquecido, então não paga mais a inicialização.
+#
+# - pipeline.py roda a cada POLL_INTERVAL segundos: com o GET condicional e os
+#   critérios de pulo do pipeline, uma consulta sem dados novos termina em segundos,
+#   e um dia publicado pelo IPEA chega ao app em minutos e não no dia seguinte;
+# - backtest.py roda a cada BACKTEST_INTERVAL segundos (semanal);
+# - um job por vez: um job que vence enquanto outro roda espera a vez, e vencimentos
+#   e disparos repetidos do mesmo job viram uma única execução;
+# - cada execução tem um tempo máximo (PIPELINE_TIMEOUT, BACKTEST_TIMEOUT); o filho roda
+#   no seu próprio grupo de processos, e no fim do prazo o grupo todo (pools e
+#   processos do Stan) recebe SIGTERM e, depois de KILL_GRACE segundos, SIGKILL.
+#   A versão publicada continua sendo a anterior;
+# - disparo sob demanda: um arquivo TRIGGER_DIR/<job>, cujo conteúdo são argumentos
+#   extras da linha de comando do job (ex.: --full --force), criado por
+#   `python worker.py --trigger pipeline --args "--force"` ou por qualquer processo
+#   com acesso ao volume compartilhado;
+# - início, fim, duração e resultado da última execução de cada job ficam em
+#   WORKER_STATE, lido na inicialização para manter o calendário entre reinícios;
+# - um lock (WORKER_LOCK) impede dois workers sobre o mesmo diretório compartilhado.
+#
+#   python worker.py                                    # processo residente
+#   python worker.py --trigger pipeline [--args "--full"]
+
+import argparse
+import fcntl
+import json
+import os
+import shlex
+import signal
+import sys
+import time
+import traceback
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+
+import artifacts
+import backtest
+import pipeline
+
+# Intervalo (s) entre execuções agendadas do pipeline e do backtest
+POLL_INTERVAL = float(os.environ.get('POLL_INTERVAL', 15 * 60))
+BACKTEST_INTERVAL = float(os.environ.get('BACKTEST_INTERVAL', 7 * 24 * 3600))
+
+# Tempo máximo (s) de cada execução
+PIPELINE_TIMEOUT = float(os.environ.get('PIPELINE_TIMEOUT', 3600))
+BACKTEST_TIMEOUT = float(os.environ.get('BACKTEST_TIMEOUT', 6 * 3600))
+
+# Espera (s) entre o SIGTERM e o SIGKILL de uma execução que passou do prazo
+KILL_GRACE = float(os.environ.get('KILL_GRACE', 10))
+
+# Intervalo (s) entre verificações de disparos, prazos e execuções terminadas
+TICK = float(os.environ.get('WORKER_TICK', 1.0))
+
+TRIGGER_DIR = os.environ.get('TRIGGER_DIR', os.path.join(pipeline.SHARED_DIR, 'triggers'))
+WORKER_STATE = os.environ.get('WORKER_STATE', os.path.join(pipeline.SHARED_DIR, 'worker.json'))
+WORKER_LOCK = os.environ.get('WORKER_LOCK', os.path.join(pipeline.SHARED_DIR, 'worker.lock'))
+
+JOBS = {
+    'pipeline': {'main': pipeline.main, 'interval': POLL_INTERVAL, 'timeout': PIPELINE_TIMEOUT},
+    'backtest': {'main': backtest.main, 'interval': BACKTEST_INTERVAL, 'timeout': BACKTEST_TIMEOUT},
+}
+
+
+def log(mensagem):
+
+    print(f"{datetime.now().isoformat(timespec='seconds')} [worker] {mensagem}", flush=True)
+
+
+def warm_up():
+    # Ajuste de uma série sintética curta: carrega o cmdstanpy e o executável do Stan
+    # no processo que será copiado para cada execução
+    inicio = time.perf_counter()
+
+    df = pd.DataFrame({'ds': pd.date_range('2020-01-01', periods=60, freq='D'), 'y': np.arange(60.0)})
+    Prophet(yearly_seasonality=False, weekly_seasonality=False, uncertainty_samples=0).fit(df)
+
+    return time.perf_counter() - inicio
+
+
+def write_trigger(job, extra=''):
+    # Disparo sob demanda; um disparo pendente do mesmo job é substituído
+    os.makedirs(TRIGGER_DIR, exist_ok=True)
+
+    with artifacts.atomic_path(os.path.join(TRIGGER_DIR, job)) as tmp:
+        with open(tmp, 'w') as file:
+            file.write(extra)
+
+
+def acquire_lock(path):
+    # Lock exclusivo mantido enquanto o worker estiver vivo, ou None se já houver outro
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    # aberto sem truncar: quem não consegue o lock não apaga o PID do worker em execução
+    file = open(path, 'a+')
+
+    try:
+        fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    except BlockingIOError:
+        file.close()
+        return None
+
+    file.seek(0)
+    file.truncate()
+    file.write(str(os.getpid()))
+    file.flush()
+
+    return file
+
+
+def run_child(main, argv):
+    # Corpo do processo filho: executa o main() do job e termina sem voltar ao laço do worker
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    codigo = 1
+
+    try:
+        main(argv)
+        codigo = 0
+
+    except SystemExit as err:
+        codigo = err.code if isinstance(err.code, int) else 1
+
+    except BaseException:
+        traceback.print_exc()
+
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(codigo)
+
+
+class Worker:
+
+    def __init__(self, jobs=JOBS, state_file=WORKER_STATE, trigger_dir=TRIGGER_DIR, tick=TICK):
+        self.jobs = jobs
+        self.state_file = state_file
+        self.trigger_dir = trigger_dir
+        self.tick = tick
+
+        self.state = self.read_state()
+
+        # job -> argumentos da próxima execução, na ordem em que ficaram pendentes
+        self.pending = {}
+
+        # execução em andamento: job, pid, argumentos, início e prazo
+        self.running = None
+
+        self.stopping = False
+
+    def read_state(self):
+
+        try:
+
+            with open(self.state_file, 'r') as file:
+                return json.load(file)
+
+        except (FileNotFoundError, json.JSONDecodeError):
+
+            return {}
+
+    def save_state(self):
+
+        with artifacts.atomic_path(self.state_file) as tmp:
+            with open(tmp, 'w') as file:
+                json.dump(self.state, file, indent=2)
+
+    def due(self, job):
+        # Vence quando o último início agendado ou disparado tem mais de `interval` segundos
+        ultimo = self.state.get(job, {}).get('last_start')
+
+        return ultimo is None or time.time() - ultimo >= self.jobs[job]['interval']
+
+    def collect_triggers(self):
+
+        if not os.path.isdir(self.trigger_dir):
+            return
+
+        for nome in sorted(os.listdir(self.trigger_dir)):
+
+            caminho = os.path.join(self.trigger_dir, nome)
+
+            if '.tmp' in nome or not os.path.isfile(caminho):
+                continue
+
+            with open(caminho, 'r') as file:
+                extra = shlex.split(file.read())
+
+            os.remove(caminho)
+
+            if nome not in self.jobs:
+                log(f"Disparo ignorado, job desconhecido: {nome}")
+                continue
+
+            log(f"Disparo de {nome} {' '.join(extra)}".rstrip())
+
+            # argumentos do disparo substituem os de uma execução agendada ainda pendente
+            self.pending[nome] = extra
+
+    def schedule(self):
+
+        for job in self.jobs:
+
+            ocupado = self.running is not None and self.running['job'] == job
+
+            if job not in self.pending and not ocupado and self.due(job):
+                self.pending[job] = []
+
+    def start_next(self):
+
+        if self.running is not None or not self.pending:
+            return
+
+        job = next(iter(self.pending))
+        argv = self.pending.pop(job)
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        pid = os.fork()
+
+        if pid == 0:
+            run_child(self.jobs[job]['main'], argv)
+
+        agora = time.time()
+
+        self.running = {'job': job, 'pid': pid, 'argv': argv, 'start': agora,
+                        'deadline': agora + self.jobs[job]['timeout'], 'killed': None}
+
+        self.state.setdefault(job, {}).update(last_start=agora, status='running', pid=pid)
+        self.save_state()
+
+        log(f"{job} iniciado (pid {pid}) {' '.join(argv)}".rstrip())
+
+    def check_running(self):
+
+        if self.running is None:
+            return
+
+        execucao = self.running
+        pid, status = os.waitpid(execucao['pid'], os.WNOHANG)
+
+        if pid == 0:
+            self.enforce_timeout(execucao)
+            return
+
+        duracao = time.time() - execucao['start']
+
+        if execucao['killed']:
+            resultado = 'timeout'
+        elif os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0:
+            resultado = 'ok'
+        else:
+            resultado = 'failed'
+
+        self.state[execucao['job']].update(last_end=time.time(), status=resultado, seconds=round(duracao, 3),
+                                           exit_code=os.waitstatus_to_exitcode(status),
+                                           runs=self.state[execucao['job']].get('runs', 0) + 1)
+        self.state[execucao['job']].pop('pid', None)
+        self.save_state()
+
+        log(f"{execucao['job']} terminado: {resultado} em {duracao:.1f}s")
+
+        self.running = None
+
+    def enforce_timeout(self, execucao):
+        # SIGTERM no grupo do filho ao fim do prazo e SIGKILL KILL_GRACE segundos depois
+        agora = time.time()
+
+        if execucao['killed'] is None and agora >= execucao['deadline']:
+            log(f"{execucao['job']} passou de {self.jobs[execucao['job']]['timeout']:.0f}s, encerrando")
+            self.signal_running(signal.SIGTERM)
+            execucao['killed'] = agora
+
+        elif execucao['killed'] is not None and agora - execucao['killed'] >= KILL_GRACE:
+            self.signal_running(signal.SIGKILL)
+
+    def signal_running(self, sinal):
+
+        try:
+            os.killpg(self.running['pid'], sinal)
+
+        except ProcessLookupError:
+            pass
+
+    def stop(self, sinal, frame):
+
+        self.stopping = True
+
+    def loop(self):
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        while not self.stopping:
+
+            self.check_running()
+            self.collect_triggers()
+            self.schedule()
+            self.start_next()
+
+            time.sleep(self.tick)
+
+        # encerramento do contêiner: a execução em andamento é interrompida e a versão
+        # publicada continua sendo a anterior
+        if self.running is not None:
+            log(f"Encerrando {self.running['job']} (pid {self.running['pid']})")
+            self.signal_running(signal.SIGTERM)
+            self.running['killed'] = time.time()
+
+            while self.running is not None:
+                self.check_running()
+                time.sleep(0.1)
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--trigger', choices=sorted(JOBS),
+                        help='pede uma execução ao worker em andamento e termina')
+    parser.add_argument('--args', default='',
+                        help='argumentos do job disparado, ex.: "--full --force"')
+    args = parser.parse_args(argv)
+
+    if args.trigger:
+        write_trigger(args.trigger, args.args)
+        print(f"Disparo de {args.trigger} gravado em {TRIGGER_DIR}")
+        return
+
+    lock = acquire_lock(WORKER_LOCK)
+
+    if lock is None:
+        sys.exit(f"Já existe um worker em execução ({WORKER_LOCK})")
+
+    log(f"Stan carregado em {warm_up():.1f}s; pipeline a cada {POLL_INTERVAL:.0f}s, "
+        f"backtest a cada {BACKTEST_INTERVAL:.0f}s")
+
+    Worker().loop()
+
+    log("Worker encerrado")
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,108 @@
+# coding: utf-8
+
+# Índice de estatísticas por intervalo de datas da série diária, usado nos KPIs do app.
+# Montado uma vez por versão dos dados (dashboard.price_index), responde a qualquer
+# período do slider sem filtrar nem copiar o DataFrame:
+#
+# - limites do período: busca binária (np.searchsorted) nas datas ordenadas, com o
+#   mesmo intervalo [inicio, fim) do storage.read_refined;
+# - soma, contagem e média: somas prefixadas, O(1);
+# - mínimo e máximo: sparse table sobre o mínimo/máximo de blocos de BLOCK linhas. Os
+#   blocos inteiros do período são cobertos por duas consultas O(1) à tabela e as
+#   pontas (menos de BLOCK linhas de cada lado) são lidas direto da série. A tabela
+#   ocupa n/BLOCK * log2(n/BLOCK) posições, e não n * log2(n) como sobre as linhas.
+#
+# Valores ausentes (NaN) ficam fora da soma, da contagem, do mínimo e do máximo, como no
+# min()/mean()/max() do pandas; um período vazio devolve NaN.
+
+import numpy as np
+
+BLOCK = 64
+
+
+def sparse_table(valores, funcao):
+    # níveis[k][i] = funcao dos 2**k valores a partir de i
+    niveis = [valores]
+
+    while 2 ** len(niveis) <= len(valores):
+        anterior = niveis[-1]
+        meio = 2 ** (len(niveis) - 1)
+        niveis.append(funcao(anterior[:-meio], anterior[meio:]))
+
+    return niveis
+
+
+class RangeStats:
+
+    def __init__(self, ds, y, block=BLOCK):
+        ds = np.asarray(ds, dtype='datetime64[ns]')
+        y = np.asarray(y, dtype=np.float64)
+
+        # o refined já vem ordenado; a ordenação fica para séries montadas de outra forma
+        if len(ds) > 1 and (ds[1:] < ds[:-1]).any():
+            ordem = np.argsort(ds, kind='stable')
+            ds, y = ds[ordem], y[ordem]
+
+        self.ds = ds
+        self.y = y
+        self.block = block
+
+        validos = ~np.isnan(y)
+
+        self.soma = np.concatenate(([0.0], np.cumsum(np.where(validos, y, 0.0))))
+        self.contagem = np.concatenate(([0], np.cumsum(validos)))
+
+        # mínimo e máximo de cada bloco; o último bloco é completado com NaN
+        n_blocos = -(-len(y) // block)
+        blocos = np.full(n_blocos * block, np.nan)
+        blocos[:len(y)] = y
+        blocos = blocos.reshape(n_blocos, block)
+
+        self.minimo = sparse_table(np.fmin.reduce(blocos, axis=1), np.fmin)
+        self.maximo = sparse_table(np.fmax.reduce(blocos, axis=1), np.fmax)
+
+    def __len__(self):
+
+        return len(self.y)
+
+    def bounds(self, inicio, fim):
+        # posições [i, j) das datas em [inicio, fim)
+        inicio = np.datetime64(inicio, 'ns')
+        fim = np.datetime64(fim, 'ns')
+
+        return int(np.searchsorted(self.ds, inicio, 'left')), int(np.searchsorted(self.ds, fim, 'left'))
+
+    def reduce(self, niveis, funcao, i, j):
+        # funcao (np.fmin ou np.fmax) das linhas [i, j), j > i
+        primeiro, ultimo = i // self.block, (j - 1) // self.block
+
+        if primeiro == ultimo:
+            return funcao.reduce(self.y[i:j])
+
+        resultado = funcao(funcao.reduce(self.y[i:(primeiro + 1) * self.block]),
+                           funcao.reduce(self.y[ultimo * self.block:j]))
+
+        # blocos inteiros entre as pontas: duas janelas de 2**k blocos que se sobrepõem
+        inicio, fim = primeiro + 1, ultimo
+
+        if fim > inicio:
+            k = (fim - inicio).bit_length() - 1
+            resultado = funcao(resultado, funcao(niveis[k][inicio], niveis[k][fim - 2 ** k]))
+
+        return resultado
+
+    def stats(self, inicio, fim):
+        # linhas, soma, média, mínimo e máximo das datas em [inicio, fim)
+        i, j = self.bounds(inicio, fim)
+
+        n = int(self.contagem[j] - self.contagem[i])
+        soma = self.soma[j] - self.soma[i]
+
+        # np.float64 também no período vazio, como o min()/mean()/max() do pandas
+        if n == 0:
+            vazio = np.float64(np.nan)
+            return {'rows': j - i, 'sum': np.float64(0.0), 'mean': vazio, 'min': vazio, 'max': vazio}
+
+        return {'rows': j - i, 'sum': soma, 'mean': soma / n,
+                'min': self.reduce(self.minimo, np.fmin, i, j),
+                'max': self.reduce(self.maximo, np.fmax, i, j)}